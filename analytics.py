@@ -0,0 +1,379 @@
+"""Aggregations behind the dashboard's metrics and charts.
+
+Like storage.py this module does not import streamlit, and values kept here
+are shared by every session of the process.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import record_cache_call, record_cache_miss, stage
+from storage import (PHASE_ORDER, PHASE_DATE_COLUMNS, STATUS_OPTIONS, TRANSITIONS_LOG, as_category,
+                     file_signature, read_transitions)
+
+# Phases reached once the drone survey is done
+SURVEY_COMPLETED_PHASES = PHASE_ORDER[2:]
+GROUP_COLUMNS = ['Municipal_Zone', 'Status', 'Current_Phase']
+# Columns the phase durations are broken down by
+BREAKDOWN_COLUMNS = ['Municipal_Zone', 'HDM_JDM', 'ATP_MTP', 'ARRO_Officer']
+DAY = np.timedelta64(1, 'D')
+
+
+class VersionedSnapshot:
+    """The latest value computed from one version of the data.
+
+    get() recomputes only when the data version changes. advance() applies a
+    cheap incremental update instead, when the caller knows exactly what
+    changed between two versions.
+    """
+
+    def __init__(self, name, compute):
+        self.name = name
+        self._compute = compute
+        self._lock = threading.Lock()
+        self._version = None
+        self._value = None
+
+    def get(self, version, *args):
+        record_cache_call(self.name)
+        with self._lock:
+            if self._value is not None and self._version == version:
+                return self._value
+        record_cache_miss(self.name)
+        with stage(f'compute:{self.name}'):
+            value = self._compute(*args)
+        with self._lock:
+            self._version, self._value = version, value
+        return value
+
+    def advance(self, from_version, to_version, update, *args):
+        """Move the snapshot from from_version to to_version with update(value, *args).
+        Returns False (and leaves the snapshot alone) if it is not at from_version."""
+        with self._lock:
+            if self._value is None or self._version != from_version:
+                return False
+            with stage(f'advance:{self.name}'):
+                self._value = update(self._value, *args)
+            self._version = to_version
+            return True
+
+
+def _key(row):
+    """(zone, status, phase) of a village row, with None for missing values"""
+    return tuple(None if pd.isna(row.get(col)) else row.get(col) for col in GROUP_COLUMNS)
+
+
+def _derive(counts, total):
+    """Build every Overview aggregate from the (zone, status, phase) counts"""
+    frame = pd.DataFrame([key + (n,) for key, n in counts.items() if n > 0],
+                         columns=GROUP_COLUMNS + ['Count'])
+    frame['Count'] = frame['Count'].astype(int)
+
+    def tally(col, label):
+        # Same ordering as value_counts(): most frequent first
+        counted = frame.dropna(subset=[col]).groupby(col)['Count'].sum()
+        counted = counted.sort_values(ascending=False, kind='stable').reset_index()
+        counted.columns = [label, 'Count']
+        return counted
+
+    phase_counts = tally('Current_Phase', 'Phase')
+    phase_counts['Phase'] = pd.Categorical(phase_counts['Phase'], categories=PHASE_ORDER, ordered=True)
+    phase_counts = phase_counts.sort_values('Phase')
+    by_phase = dict(zip(phase_counts['Phase'].astype(object), phase_counts['Count']))
+
+    zone_status = (frame.dropna(subset=['Municipal_Zone', 'Status'])
+                   .pivot_table(index='Municipal_Zone', columns='Status', values='Count',
+                                aggfunc='sum', fill_value=0))
+
+    return {
+        'counts': counts,
+        'total': total,
+        'survey_completed': int(sum(by_phase.get(p, 0) for p in SURVEY_COMPLETED_PHASES)),
+        'map2_awaited': int(by_phase.get('Map 2 awaited', 0)),
+        'ground_truthing': int(by_phase.get('Ground Truthing Pending', 0)),
+        'phase_counts': phase_counts,
+        'zone_counts': tally('Municipal_Zone', 'Zone'),
+        'status_counts': tally('Status', 'Status'),
+        'zone_status': zone_status,
+    }
+
+
+def compute_overview_aggregates(df):
+    """All Overview metrics and chart data from one groupby over villages df"""
+    if df.empty:
+        return _derive({}, 0)
+    grouped = df.groupby(GROUP_COLUMNS, dropna=False, observed=True).size()
+    counts = {}
+    for key, n in grouped.items():
+        key = tuple(None if pd.isna(v) else v for v in key)
+        counts[key] = counts.get(key, 0) + int(n)
+    return _derive(counts, len(df))
+
+
+def update_overview_aggregates(aggregates, old_row, new_row):
+    """Aggregates after one village changed from old_row to new_row.
+
+    Either row may be None for an added or removed village. Only the two
+    affected (zone, status, phase) counters move, then the small derived
+    tables are rebuilt from the counters.
+    """
+    counts = dict(aggregates['counts'])
+    total = aggregates['total']
+    if old_row is not None:
+        key = _key(old_row)
+        counts[key] = counts.get(key, 0) - 1
+        total -= 1
+    if new_row is not None:
+        key = _key(new_row)
+        counts[key] = counts.get(key, 0) + 1
+        total += 1
+    return _derive(counts, total)
+
+
+overview_snapshot = VersionedSnapshot('overview_aggregates', compute_overview_aggregates)
+
+
+def phase_durations(df):
+    """Days each village spent in each phase, one column per phase with an
+    end date. Missing dates and negative spans (dates entered out of order)
+    give NaN."""
+    dates = {}
+    for col in set(col for pair in PHASE_DATE_COLUMNS.values() for col in pair if col):
+        if col in df.columns:
+            dates[col] = df[col].to_numpy()
+        else:
+            dates[col] = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    columns = {}
+    for phase, (start, end) in PHASE_DATE_COLUMNS.items():
+        if end is None:
+            continue
+        days = (dates[end] - dates[start]) / DAY
+        days[days < 0] = np.nan
+        columns[phase] = days
+    return pd.DataFrame(columns, index=df.index)
+
+
+def compute_phase_timeline(df):
+    """Per-village phase durations, per-phase statistics and median durations
+    by zone and officer, from one villages df"""
+    durations = phase_durations(df)
+    phase_stats = pd.DataFrame({
+        'Phase': durations.columns,
+        'Villages': durations.count().to_numpy(),
+        'Mean_Days': durations.mean().to_numpy(),
+        'Median_Days': durations.median().to_numpy(),
+        'P90_Days': durations.quantile(0.9).to_numpy(),
+    })
+    breakdowns = {}
+    for col in BREAKDOWN_COLUMNS:
+        if col in df.columns:
+            breakdowns[col] = durations.groupby(df[col], observed=True).median().dropna(how='all')
+    return {'durations': durations, 'phase_stats': phase_stats, 'breakdowns': breakdowns}
+
+
+def with_observed_durations(progress_df, timeline):
+    """progress_df with Avg_Duration_Days replaced by the mean observed
+    duration of each phase; phases with no observations keep their value"""
+    if progress_df.empty or 'Phase' not in progress_df.columns:
+        return progress_df
+    stats = timeline['phase_stats'].set_index('Phase')
+    observed = progress_df['Phase'].map(stats['Mean_Days'].where(stats['Villages'] > 0).round())
+    if 'Avg_Duration_Days' in progress_df.columns:
+        observed = observed.fillna(progress_df['Avg_Duration_Days'])
+    if observed.notna().all():
+        observed = observed.astype(int)
+    return progress_df.assign(Avg_Duration_Days=observed)
+
+
+phase_timeline_snapshot = VersionedSnapshot('phase_timeline', compute_phase_timeline)
+
+
+def expected_durations(progress_df):
+    """{phase: planned days} from the Avg_Duration_Days of progress_data.csv"""
+    if not {'Phase', 'Avg_Duration_Days'} <= set(progress_df.columns):
+        return {}
+    return dict(zip(progress_df['Phase'], pd.to_numeric(progress_df['Avg_Duration_Days'], errors='coerce')))
+
+
+def classify_status(df, expected_days, today):
+    """Schedule status of every village of df, computed as of the day today.
+
+    Villages in the last phase are Completed. Others are Behind Schedule once
+    they have been in their current phase for longer than expected_days
+    (phase -> days; phases with no positive value have no deadline) and On
+    Track before that. Villages without the date they entered their current
+    phase keep their typed Status.
+    """
+    phases = pd.Categorical(df['Current_Phase'], categories=PHASE_ORDER).codes
+    entered = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[ns]')
+    limit = np.full(len(df), np.nan)
+    for code, phase in enumerate(PHASE_ORDER):
+        start = PHASE_DATE_COLUMNS[phase][0]
+        rows = phases == code
+        if start not in df.columns or not rows.any():
+            continue
+        dates = df[start]
+        if not pd.api.types.is_datetime64_dtype(dates):
+            dates = pd.to_datetime(dates, errors='coerce')
+        entered[rows] = dates.to_numpy()[rows]
+        limit[rows] = expected_days.get(phase, np.nan)
+    elapsed = (np.datetime64(pd.Timestamp(today).normalize(), 'ns') - entered) / DAY
+
+    # Work on category codes: STATUS_OPTIONS are the leading categories
+    typed = df['Status'] if 'Status' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    typed = as_category(typed, STATUS_OPTIONS)
+    codes = typed.cat.codes.to_numpy().copy()
+    completed, on_track, behind = (STATUS_OPTIONS.index(s) for s in ('Completed', 'On Track', 'Behind Schedule'))
+    known = ~np.isnan(elapsed)
+    codes[known] = on_track
+    with np.errstate(invalid='ignore'):
+        codes[known & (limit > 0) & (elapsed > limit)] = behind
+    codes[phases == len(PHASE_ORDER) - 1] = completed
+    return pd.Series(pd.Categorical.from_codes(codes, typed.cat.categories), index=df.index, name='Status')
+
+
+def classify_row(row, expected_days, today):
+    """classify_status for one village row given as a dict"""
+    return classify_status(pd.DataFrame([row]), expected_days, today).iloc[0]
+
+
+def update_status(statuses, name, status):
+    """statuses with the village called name set to status (added if new)"""
+    if status not in statuses.cat.categories:
+        statuses = statuses.cat.add_categories([status])
+    if name not in statuses.index:
+        return pd.concat([statuses, pd.Series([status], index=[name], dtype=statuses.dtype, name=statuses.name)])
+    position = statuses.index.get_loc(name)
+    statuses = statuses.copy()
+    statuses.iloc[position] = status
+    return statuses
+
+
+status_snapshot = VersionedSnapshot('schedule_status', classify_status)
+
+
+def compute_phase_counts(df):
+    """Villages currently in each phase of PHASE_ORDER, and in total"""
+    counts = df['Current_Phase'].value_counts() if 'Current_Phase' in df.columns else {}
+    return {'phases': {phase: int(counts.get(phase, 0)) for phase in PHASE_ORDER}, 'total': len(df)}
+
+
+def update_phase_counts(view, old_row, new_row):
+    """view after one village moved from old_row to new_row (either may be
+    None for an added or removed village): one phase counter down, one up"""
+    phases = dict(view['phases'])
+    total = view['total']
+    if old_row is not None:
+        total -= 1
+        if old_row.get('Current_Phase') in phases:
+            phases[old_row['Current_Phase']] -= 1
+    if new_row is not None:
+        total += 1
+        if new_row.get('Current_Phase') in phases:
+            phases[new_row['Current_Phase']] += 1
+    return {'phases': phases, 'total': total}
+
+
+def progress_table(view, phase_info):
+    """Per-phase progress: Completed counts the villages past each phase (in
+    Card Issuance for the last one), Target all villages. Other columns
+    (durations, contacts) come from phase_info, one row per Phase."""
+    in_phase = [view['phases'][phase] for phase in PHASE_ORDER]
+    past = np.cumsum(in_phase[::-1])[::-1]
+    completed = np.append(past[1:], in_phase[-1])
+    table = pd.DataFrame({'Phase': PHASE_ORDER, 'Completed': completed, 'Target': view['total']})
+    if 'Phase' in phase_info.columns:
+        info = phase_info.drop(columns=['Completed', 'Target'], errors='ignore').drop_duplicates('Phase')
+        table = table.merge(info, on='Phase', how='left')
+    return table
+
+
+progress_snapshot = VersionedSnapshot('progress_view', compute_phase_counts)
+
+
+class TransitionCounters:
+    """Villages per phase, zone and status, and per phase on every day,
+    maintained from the transition log (see storage.append_transitions).
+
+    refresh() reads only the records appended since the previous call and
+    moves the counters by them; the log is read again from the start only
+    when it was replaced.
+    """
+
+    def __init__(self, log_path=TRANSITIONS_LOG):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, signature):
+        self._signature = signature
+        self._offset = 0
+        self.since = None
+        self.transitions = 0
+        self._counters = {'phase': {}, 'zone': {}, 'status': {}}
+        # Change in the villages of each phase, per day
+        self._daily = {}
+
+    def _move(self, key, by, day):
+        zone, phase, status = key
+        for counter, value in zip(self._counters.values(), (phase, zone, status)):
+            counter[value] = counter.get(value, 0) + by
+        deltas = self._daily.setdefault(day, {})
+        deltas[phase] = deltas.get(phase, 0) + by
+
+    def _apply(self, record):
+        day = record['at'][:10]
+        if 'baseline' in record:
+            self._reset(self._signature)
+            self.since = record['at']
+            for *key, villages in record['baseline']:
+                self._move(key, villages, day)
+            return
+        if self.since is None:
+            return
+        if record.get('from') is not None:
+            self._move(record['from'], -1, day)
+        if record.get('to') is not None:
+            self._move(record['to'], 1, day)
+        self.transitions += 1
+
+    def refresh(self):
+        """Apply the records appended since the last call; returns the log's
+        signature, which changes with every append"""
+        signature = file_signature(self.log_path)
+        with self._lock:
+            if signature == self._signature:
+                return signature
+            with stage('advance:transition_counters'):
+                if (signature is None or self._signature is None or signature[0] != self._signature[0]
+                        or signature[2] < self._offset):
+                    self._reset(signature)
+                records, self._offset = read_transitions(self._offset, self.log_path)
+                for record in records:
+                    self._apply(record)
+                self._signature = signature
+            return signature
+
+    def counts(self, by):
+        """{value: villages} for by in 'phase', 'zone' or 'status', without
+        blanks and values no village has any more"""
+        with self._lock:
+            return {value: n for value, n in self._counters[by].items() if n and value is not None}
+
+    def phase_history(self):
+        """Villages in each phase (columns, in PHASE_ORDER) at the end of
+        every day (index) since the log started"""
+        with self._lock:
+            deltas = pd.DataFrame.from_dict(self._daily, orient='index')
+        if deltas.empty:
+            return pd.DataFrame(columns=PHASE_ORDER)
+        deltas.index = pd.to_datetime(deltas.index)
+        deltas = deltas.reindex(columns=PHASE_ORDER).fillna(0).sort_index()
+        # Days without changes carry the previous day's counts
+        days = pd.date_range(deltas.index.min(), deltas.index.max(), freq='D')
+        return deltas.reindex(days, fill_value=0).cumsum().astype(int)
+
+
+transition_counters = TransitionCounters()
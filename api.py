@@ -0,0 +1,294 @@
+"""Read-only JSON API over the dashboard data, for other district systems.
+
+    python api.py                           # http://127.0.0.1:8502
+    python api.py --address 0.0.0.0 --port 8502
+
+Endpoints (GET or HEAD):
+
+    /api/villages        ?zone=A&phase=Map 3&status=On Track&village=...&q=...
+    /api/progress        per-phase Completed, Target, durations and contacts
+    /api/responsibility
+    /api/remarks         ?department=...&status=Pending&help_required=Technical Support
+                         &village=...&phase=...&q=...&from=2024-01-01&to=...
+    /api/versions        change tokens of every data set
+
+villages and remarks are paginated with limit (default 100, at most 1000)
+and offset, and answer {"total", "offset", "limit", "items"}. A villages
+filter may be repeated to match any of its values (zone=A&zone=B); q matches
+part of the village name, or every word of the remarks text as for the
+dashboard's remarks search. A village's Status is the computed schedule
+status shown on the Overview. A remark's Status is Pending, In Progress,
+Resolved or Referred, and Help_Required one of the form's help types
+(General Query, Technical Support, Resource Requirement, Coordination
+Needed, Approval Required, Other). Dates are YYYY-MM-DD and missing values null.
+
+The data is read through the same storage layer as the dashboard (the
+SQLite or CSV villages backend, remarks CSV plus log, Arrow snapshots), and
+kept in memory per data version like the dashboard's caches. Every response
+carries an ETag derived from the versions of the data it was built from;
+a request with a matching If-None-Match is answered 304 without reading any
+data, and encoded responses are kept for repeated requests. Responses over
+1 KB are gzip-compressed for clients that accept it. Data versions are
+looked up at most once a second, so a change shows up within a second.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from analytics import (VersionedSnapshot, expected_durations, phase_timeline_snapshot, progress_snapshot,
+                       progress_table, status_snapshot, with_observed_durations)
+from instrumentation import stage, write_profile
+from remarks_index import remarks_index_snapshot
+from storage import (PROGRESS_DATA, VILLAGE_COLUMNS, data_versions, get_storage, load_csv, load_remarks,
+                     load_responsibility)
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Encoded responses kept for repeated requests, most recently used first out
+RESPONSE_CACHE_SIZE = 256
+GZIP_MIN_BYTES = 1024
+
+VILLAGE_FILTERS = {'zone': 'Municipal_Zone', 'phase': 'Current_Phase', 'status': 'Status', 'village': 'Village_Name'}
+REMARK_FILTERS = {'department': 'Department', 'status': 'Status', 'help_required': 'Help_Required',
+                  'village': 'Village', 'phase': 'Phase'}
+
+_villages = VersionedSnapshot('api:villages', lambda: get_storage().load_villages())
+_progress_info = VersionedSnapshot('api:progress_info', load_csv)
+_responsibility = VersionedSnapshot('api:responsibility', load_responsibility)
+_remarks = VersionedSnapshot('api:remarks', load_remarks)
+
+_responses = OrderedDict()
+_responses_lock = threading.Lock()
+
+
+class QueryError(ValueError):
+    """A request parameter that cannot be used; answered with 400"""
+
+
+def _today():
+    return pd.Timestamp.now().normalize()
+
+
+def _param(query, name):
+    values = query.get(name)
+    return values[-1].strip() if values else ''
+
+
+def _int_param(query, name, default, low, high):
+    value = _param(query, name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a whole number")
+    if not low <= number <= high:
+        raise QueryError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def _date_param(query, name):
+    value = _param(query, name)
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a date (YYYY-MM-DD)")
+
+
+def _records(df):
+    """Rows of df as JSON-ready dicts: dates as YYYY-MM-DD, whole numbers
+    without a decimal point and missing values None"""
+    converted = {}
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            converted[col] = df[col].dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_float_dtype(df[col]) and (df[col].dropna() % 1 == 0).all():
+            converted[col] = df[col].astype('Int64')
+    return json.loads(df.assign(**converted).to_json(orient='records', force_ascii=False))
+
+
+def _page(df, query):
+    limit = _int_param(query, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_param(query, 'offset', 0, 0, np.iinfo(np.int64).max)
+    return {'total': len(df), 'offset': offset, 'limit': limit, 'items': _records(df.iloc[offset:offset + limit])}
+
+
+def villages_with_status(versions):
+    """Villages with the Overview's computed Status, as load_villages_with_status"""
+    villages_df = _villages.get(versions['villages'])
+    if villages_df.empty:
+        return villages_df
+    today = _today()
+    expected_days = expected_durations(_progress_info.get(versions['progress'], PROGRESS_DATA))
+    version = (versions['villages'], versions['progress'], today.strftime('%Y-%m-%d'))
+    return villages_df.assign(Status=status_snapshot.get(version, villages_df, expected_days, today))
+
+
+def get_villages(versions, query):
+    df = villages_with_status(versions)
+    mask = np.ones(len(df), dtype=bool)
+    for name, col in VILLAGE_FILTERS.items():
+        values = [value.strip() for value in query.get(name, [])]
+        if values and col in df.columns:
+            mask &= df[col].isin(values).to_numpy()
+    text = _param(query, 'q')
+    if text and 'Village_Name' in df.columns:
+        mask &= df['Village_Name'].str.contains(text, case=False, regex=False, na=False).to_numpy()
+    df = df[[col for col in VILLAGE_COLUMNS if col in df.columns]]
+    return _page(df if mask.all() else df[mask], query)
+
+
+def get_progress(versions, query):
+    """Per-phase progress, as load_progress_data"""
+    villages_df = _villages.get(versions['villages'])
+    phase_info = _progress_info.get(versions['progress'], PROGRESS_DATA)
+    table = progress_table(progress_snapshot.get(versions['villages'], villages_df), phase_info)
+    return {'items': _records(with_observed_durations(
+        table, phase_timeline_snapshot.get(versions['villages'], villages_df)))}
+
+
+def get_responsibility(versions, query):
+    return {'items': _records(_responsibility.get(versions['responsibility']))}
+
+
+def get_remarks(versions, query):
+    remarks_df = _remarks.get(versions['remarks'])
+    filters = {col: _param(query, name) for name, col in REMARK_FILTERS.items() if _param(query, name)}
+    date_from, date_to = _date_param(query, 'from'), _date_param(query, 'to')
+    index = remarks_index_snapshot.get(versions['remarks'], remarks_df)
+    return _page(index.search(filters, _param(query, 'q'), date_from, date_to), query)
+
+
+def get_versions(versions, query):
+    return versions
+
+
+# path -> (data sets the response is built from, handler)
+ENDPOINTS = {
+    '/api/villages': (('villages', 'progress'), get_villages),
+    '/api/progress': (('villages', 'progress'), get_progress),
+    '/api/responsibility': (('responsibility',), get_responsibility),
+    '/api/remarks': (('remarks',), get_remarks),
+    '/api/versions': (('villages', 'progress', 'responsibility', 'remarks'), get_versions),
+}
+
+
+def _etag(path, query, versions, names):
+    """Entity tag of a response: the request and the versions of its data.
+    Today's date is included because the computed statuses move on at midnight."""
+    key = [path, sorted(query.items()), [versions[name] for name in names], _today().strftime('%Y-%m-%d')]
+    return '"' + hashlib.sha1(json.dumps(key, default=str).encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def _cached_response(etag, build):
+    """(body, gzipped body or None) of the response tagged etag"""
+    with _responses_lock:
+        if etag in _responses:
+            _responses.move_to_end(etag)
+            return _responses[etag]
+    body = json.dumps(build(), default=str, ensure_ascii=False).encode('utf-8')
+    response = (body, gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None)
+    with _responses_lock:
+        _responses[etag] = response
+        while len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+    return response
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this each response
+    # on a kept-alive connection waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+    server_version = 'SvamitvaDashboardAPI'
+    quiet = True
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_request(self, code='-', size='-'):
+        if not self.quiet:
+            super().log_request(code, size)
+
+    def _send(self, status, body=b'', headers=(), send_body=True):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def _error(self, status, message, send_body):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self._send(status, body, [('Content-Type', 'application/json; charset=utf-8')], send_body)
+
+    def _respond(self, send_body):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        if path not in ENDPOINTS:
+            self._error(404, f"Unknown endpoint {url.path}; try one of {', '.join(ENDPOINTS)}", send_body)
+            return
+        names, handler = ENDPOINTS[path]
+        query = parse_qs(url.query)
+        versions = data_versions()
+        etag = _etag(path, query, versions, names)
+        headers = [('ETag', etag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding')]
+
+        if_none_match = self.headers.get('If-None-Match', '')
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        if etag in tags or 'W/' + etag in tags or if_none_match.strip() == '*':
+            self._send(304, headers=headers, send_body=False)
+            return
+        try:
+            with stage(f"api:{path.rsplit('/', 1)[-1]}"):
+                body, gzipped = _cached_response(etag, lambda: handler(versions, query))
+        except QueryError as e:
+            self._error(400, str(e), send_body)
+            return
+        except Exception as e:
+            self._error(500, f"Error reading data: {e}", send_body)
+            return
+
+        headers.append(('Content-Type', 'application/json; charset=utf-8'))
+        if gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzipped
+            headers.append(('Content-Encoding', 'gzip'))
+        self._send(200, body, headers, send_body)
+        write_profile()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=int(os.environ.get('DASHBOARD_API_PORT', 8502)))
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--log', action='store_true', help="log every request to stderr")
+    args = parser.parse_args()
+    APIHandler.quiet = not args.log
+    server = ThreadingHTTPServer((args.address, args.port), APIHandler)
+    server.daemon_threads = True
+    print(f"Serving the dashboard API on http://{args.address}:{args.port}/api/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,36 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime
+import hmac
+import json
+import time
 import os
-import shutil
 from io import BytesIO
+from analytics import (overview_snapshot, update_overview_aggregates, phase_timeline_snapshot,
+                       with_observed_durations, status_snapshot, classify_row, update_status,
+                       progress_snapshot, update_phase_counts, progress_table, expected_durations,
+                       transition_counters)
+from instrumentation import (record_cache_call, record_cache_miss, record_timing, cache_stats, timing_stats,
+                             reset_cache_stats, stage, timed, profile_json, profile_prometheus, write_profile,
+                             PROFILING, PROFILE_DIR)
+from exporter import excel_available, villages_csv, remarks_csv, dashboard_xlsx
+from importer import UploadFormatError, import_upload, scan_upload
+from remarks_index import remarks_index_snapshot
+from storage import (VILLAGES_DATA, PROGRESS_DATA, RESPONSIBILITY_DATA, REMARKS_DATA,
+                     REMARKS_COLUMNS, PHASE_ORDER, VERSION_COLUMN, StaleWriteError,
+                     get_storage, update_village, load_remarks, file_signature, remarks_signature,
+                     append_remark, append_remark_status, compact_remarks, load_csv, load_responsibility, atomic_write_csv,
+                     data_versions, VERSIONS_MAX_AGE)
+
+# Start of this rerun, for the profiler's whole-rerun timing
+_rerun_started = time.perf_counter()
+
+# Cached frames are shared by all sessions; copy-on-write (always on from
+# pandas 3) keeps frames derived from them from copying or modifying them
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 # Page configuration
 st.set_page_config(
@@ -121,15 +147,11 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# File paths
-VILLAGES_DATA = "villages_data.csv"
-PROGRESS_DATA = "progress_data.csv"
-RESPONSIBILITY_DATA = "responsibility_data.csv"
-REMARKS_DATA = "remarks_data.csv"
-
 # Initialize data files if they don't exist
+@timed()
 def initialize_data_files():
-    """Create sample data files if they don't exist"""
+    """Create sample data files if they don't exist; written atomically, as
+    several worker processes may start on an empty data directory at once"""
     
     if not os.path.exists(VILLAGES_DATA):
         sample_villages = {
@@ -187,14 +209,12 @@ def initialize_data_files():
                                                 None, None, None, None, None, None, None, None, None, None])
         }
         df = pd.DataFrame(sample_villages)
-        df.to_csv(VILLAGES_DATA, index=False)
+        atomic_write_csv(df, VILLAGES_DATA)
     
     if not os.path.exists(PROGRESS_DATA):
         sample_progress = {
             'Phase': ['Notification', 'Drone Survey Pending', 'Map 1 awaited', 'Ground Truthing Pending', 'Map 2 awaited',
                      'Pasting', 'Objections Hearing', 'Map 3', 'Card Issuance'],
-            'Completed': [15, 15, 13, 11, 9, 7, 5, 3, 1],
-            'Target': [15, 15, 15, 15, 15, 15, 15, 15, 15],
             'Avg_Duration_Days': [0, 25, 15, 30, 20, 90, 45, 30, 45],
             'Responsible_Department': ['DC Administration', 'Survey of India', 'Survey of India',
                                       'Property Tax Dept (HDM/JDM)', 'Survey of India', 'ATP/MTP',
@@ -204,7 +224,7 @@ def initialize_data_files():
                                'ARRO Office', 'SOI Regional Office', 'DC Office']
         }
         df = pd.DataFrame(sample_progress)
-        df.to_csv(PROGRESS_DATA, index=False)
+        atomic_write_csv(df, PROGRESS_DATA)
     
     if not os.path.exists(RESPONSIBILITY_DATA):
         sample_responsibility = {
@@ -221,158 +241,246 @@ def initialize_data_files():
                             'arro.ludhiana@punjab.gov.in', 'soi.ludhiana@nic.in', 'dc.ludhiana@punjab.gov.in']
         }
         df = pd.DataFrame(sample_responsibility)
-        df.to_csv(RESPONSIBILITY_DATA, index=False)
+        atomic_write_csv(df, RESPONSIBILITY_DATA)
     
     if not os.path.exists(REMARKS_DATA):
         # Create empty remarks file with headers
-        remarks_columns = ['Date', 'Official_Name', 'Department', 'Phase', 'Village', 'Remarks', 'Help_Required', 'Status', 'Response']
-        df = pd.DataFrame(columns=remarks_columns)
-        df.to_csv(REMARKS_DATA, index=False)
+        df = pd.DataFrame(columns=REMARKS_COLUMNS)
+        atomic_write_csv(df, REMARKS_DATA)
 
-@st.cache_data
-def load_villages_data():
-    """Load villages data from CSV"""
+# Loaders are cached on a cheap change token of their source (file inode,
+# mtime and size, or the SQLite version counter), so only data that actually
+# changed is re-read, including writes made by other processes.
+# st.cache_resource hands every session the same DataFrame instead of an
+# unpickled copy per call, so memory does not grow with the number of users.
+# These frames are shared: never modify them in place, derive new frames
+# (with copy-on-write, selecting and assigning columns copies only what changes).
+@st.cache_resource(max_entries=2)
+def _load_villages_data(signature):
+    record_cache_miss('villages')
     try:
-        df = pd.read_csv(VILLAGES_DATA)
-        # Convert date columns to datetime
-        date_columns = ['Last_Updated', 'Survey_Date', 'Notification_Date', 'Drone_Survey_Date',
-                       'Map1_Date', 'Ground_Truthing_Date', 'Map2_Date', 'Pasting_Start_Date',
-                       'Objections_Date', 'Map3_Date', 'Cards_Issued_Date']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
-        return df
+        return get_storage().load_villages()
     except Exception as e:
         st.error(f"Error loading villages data: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data
-def load_progress_data():
-    """Load progress data from CSV"""
+def villages_data_version():
+    """Current version token of the villages data"""
+    return get_storage().version()
+
+@timed()
+def load_villages_data():
+    """Load villages data from the storage backend; df.attrs['version'] is
+    the version of the data returned"""
+    record_cache_call('villages')
+    return _load_villages_data(villages_data_version())
+
+@st.cache_resource(max_entries=2)
+def _load_progress_data(signature):
+    record_cache_miss('progress')
     try:
-        return pd.read_csv(PROGRESS_DATA)
+        return load_csv(PROGRESS_DATA)
     except Exception as e:
         st.error(f"Error loading progress data: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data
-def load_responsibility_data():
-    """Load responsibility data from CSV"""
+@timed()
+def load_phase_timeline():
+    """Phase durations of the current villages data, computed once per version"""
+    villages_df = load_villages_data()
+    return phase_timeline_snapshot.get(villages_df.attrs.get('version'), villages_df)
+
+@timed()
+def load_progress_data():
+    """Per-phase progress. Completed and Target are counted from the villages
+    data (a view kept current per saved village and recounted only when the
+    data changes otherwise), Avg_Duration_Days comes from the phase dates
+    wherever any are recorded; the rest is read from progress_data.csv."""
+    record_cache_call('progress')
+    phase_info = _load_progress_data(file_signature(PROGRESS_DATA))
+    villages_df = load_villages_data()
+    view = progress_snapshot.get(villages_df.attrs.get('version'), villages_df)
+    return with_observed_durations(progress_table(view, phase_info), load_phase_timeline())
+
+@st.cache_resource(max_entries=2)
+def _load_responsibility_data(signature):
+    record_cache_miss('responsibility')
     try:
-        df = pd.read_csv(RESPONSIBILITY_DATA)
-        # Remove empty rows (rows where all values are NaN or empty)
-        df = df.dropna(how='all')
-        # Also remove rows where Phase is empty or NaN
-        if 'Phase' in df.columns:
-            df = df[df['Phase'].notna()]
-            df = df[df['Phase'].astype(str).str.strip() != '']
-        return df
+        return load_responsibility()
     except Exception as e:
         st.error(f"Error loading responsibility data: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data
-def load_remarks_data():
-    """Load remarks data from CSV"""
+def schedule_inputs():
+    """(key, expected_days, today) for the computed village status: the
+    planned Avg_Duration_Days of each phase from progress_data.csv and
+    today's date. key changes with either, so statuses move on at midnight."""
+    signature = file_signature(PROGRESS_DATA)
+    expected_days = expected_durations(_load_progress_data(signature))
+    today = pd.Timestamp.now().normalize()
+    return (signature, today.strftime('%Y-%m-%d')), expected_days, today
+
+@timed()
+def load_villages_with_status():
+    """Villages data with Status computed from the phase dates (see
+    analytics.classify_status); df.attrs['version'] also covers the
+    schedule inputs"""
+    villages_df = load_villages_data()
+    if villages_df.empty:
+        return villages_df
+    key, expected_days, today = schedule_inputs()
+    version = (villages_df.attrs.get('version'),) + key
+    statuses = status_snapshot.get(version, villages_df, expected_days, today)
+    df = villages_df.assign(Status=statuses)
+    df.attrs['version'] = version
+    return df
+
+@timed()
+def load_responsibility_data():
+    """Load responsibility data from CSV"""
+    record_cache_call('responsibility')
+    return _load_responsibility_data(file_signature(RESPONSIBILITY_DATA))
+
+@st.cache_resource(max_entries=2)
+def _load_remarks_data(signature):
+    record_cache_miss('remarks')
     try:
-        df = pd.read_csv(REMARKS_DATA)
-        # Convert Date column to datetime
-        if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce', format='mixed')
-        return df
+        return load_remarks()
     except Exception as e:
         st.error(f"Error loading remarks data: {str(e)}")
         return pd.DataFrame()
 
-def save_remarks_data(df):
-    """Save remarks data to CSV"""
+@timed()
+def load_remarks_data():
+    """Load remarks data from CSV plus the append-only remarks log"""
+    record_cache_call('remarks')
+    return _load_remarks_data(remarks_signature())
+
+@timed()
+def add_remark(remark):
+    """Append a new remark to the remarks log"""
     try:
-        df.to_csv(REMARKS_DATA, index=False)
-        load_remarks_data.clear()
+        append_remark(remark)
+        compact_remarks()
+        remember_data_versions(max_age=0)
         return True
     except PermissionError:
-        # Try workaround: save to temp file, then rename
-        try:
-            temp_file = REMARKS_DATA + '.tmp'
-            df.to_csv(temp_file, index=False)
-            
-            if os.path.exists(REMARKS_DATA):
-                try:
-                    os.remove(REMARKS_DATA)
-                except:
-                    pass
-            
-            shutil.move(temp_file, REMARKS_DATA)
-            load_remarks_data.clear()
-            return True
-        except Exception as e2:
-            st.error(f"❌ **Permission Denied**: Cannot save remarks. Please close {REMARKS_DATA} if it's open in another program.")
-            return False
+        st.error(f"❌ **Permission Denied**: Cannot save remarks. Please close {REMARKS_DATA} if it's open in another program.")
+        return False
     except Exception as e:
         st.error(f"❌ **Error saving remarks**: {str(e)}")
         return False
 
-def save_villages_data(df):
-    """Save villages data to CSV"""
+@timed()
+def respond_to_remark(remark_id, status, response):
+    """Append a status change / response for a remark to the remarks log"""
     try:
-        # Try to save directly first
-        df.to_csv(VILLAGES_DATA, index=False)
-        # Clear the specific cached function
-        load_villages_data.clear()
+        append_remark_status(remark_id, status, response)
+        compact_remarks()
+        remember_data_versions(max_age=0)
         return True
     except PermissionError:
-        # Try workaround: save to temp file, then rename
-        try:
-            
-            # Create a temporary file in the same directory
-            temp_file = VILLAGES_DATA + '.tmp'
-            df.to_csv(temp_file, index=False)
-            
-            # Try to replace the original file
-            if os.path.exists(VILLAGES_DATA):
-                # On Windows, we need to remove the old file first
-                try:
-                    os.remove(VILLAGES_DATA)
-                except:
-                    pass
-            
-            # Rename temp file to original
-            shutil.move(temp_file, VILLAGES_DATA)
-            load_villages_data.clear()
-            return True
-        except Exception as e2:
-            # If workaround also fails, show detailed error
-            file_path = os.path.abspath(VILLAGES_DATA)
-            st.error(f"""
-            ❌ **Permission Denied Error**
-            
-            The file `villages_data.csv` cannot be saved.
-            
-            **File Location:** `{file_path}`
-            
-            **Possible Causes:**
-            1. The file is open in Excel, Notepad, or another program
-            2. Another Streamlit instance has the file locked
-            3. Antivirus software is scanning the file
-            4. You don't have write permissions
-            
-            **Solutions:**
-            1. ✅ Close Excel/Notepad if `villages_data.csv` is open
-            2. ✅ Close any other Streamlit instances
-            3. ✅ Check Task Manager for processes using the file
-            4. ✅ Right-click the file → Properties → Uncheck "Read-only" if checked
-            5. ✅ Run Streamlit as Administrator (if permission issue)
-            
-            **Quick Fix:**
-            - Close all programs
-            - Click the 🔄 Reload button
-            - Try updating again
-            """)
-            return False
+        st.error(f"❌ **Permission Denied**: Cannot save remarks. Please close {REMARKS_DATA} if it's open in another program.")
+        return False
     except Exception as e:
-        st.error(f"❌ **Error saving data**: {str(e)}\n\nPlease check if the file is open in another program and try again.")
+        st.error(f"❌ **Error saving remarks**: {str(e)}")
         return False
 
+@timed()
+def import_villages_upload(uploaded_file, villages_df, replace):
+    """Write a bulk upload through the storage backend; returns the import report or None"""
+    try:
+        report = import_upload(uploaded_file, villages_df, replace=replace)
+        remember_data_versions(max_age=0)
+        return report
+    except PermissionError:
+        show_villages_permission_error()
+    except UploadFormatError as e:
+        st.error(str(e))
+    except Exception as e:
+        st.error(f"❌ **Error saving data**: {str(e)}\n\nPlease check if the file is open in another program and try again.")
+    return None
+
+@timed()
+def save_village(name, fields, expected_version=None, base=None, previous=None, loaded_version=None):
+    """Write fields of the village called name (creating it if needed) through
+    update_village.
+    
+    expected_version is the Row_Version the form was filled from and base the
+    original values of the edited fields; edits made on a stale read are merged
+    when they do not overlap and rejected otherwise. previous is the full row
+    as loaded at data version loaded_version (None for a new village) and lets
+    the Overview aggregates be updated incrementally. Returns the (Row_Version,
+    merged) tuple from the backend, or None if nothing was saved.
+    """
+    try:
+        storage = get_storage()
+        before = villages_data_version()
+        result = update_village(name, expected_version=expected_version, base=base, **fields)
+        after = villages_data_version()
+        _, merged = result
+        # When nothing else was written in between, move the shared statuses
+        # and Overview aggregates along with this one row instead of
+        # recomputing them
+        if not merged and loaded_version == before and storage.follows(before, after):
+            new_row = dict(previous or {})
+            new_row.update(fields)
+            new_row['Village_Name'] = name
+            key, expected_days, today = schedule_inputs()
+            new_row['Status'] = classify_row(new_row, expected_days, today)
+            if previous is not None:
+                previous = dict(previous, Status=classify_row(previous, expected_days, today))
+            progress_snapshot.advance(before, after, update_phase_counts, previous, new_row)
+            status_snapshot.advance((before,) + key, (after,) + key, update_status, name, new_row['Status'])
+            overview_snapshot.advance((before,) + key, (after,) + key, update_overview_aggregates, previous, new_row)
+        remember_data_versions(max_age=0)
+        return result
+    except StaleWriteError as e:
+        if e.current is not None and not e.conflicts:
+            st.error(f"❌ Village '{e.village_name}' already exists. Use Update Existing Village instead.")
+        elif e.current is None:
+            st.error(f"❌ Village '{e.village_name}' was removed by someone else. Click 🔄 Reload Data.")
+        else:
+            changed = ', '.join(f"{col} → {e.current.get(col)}" for col in e.conflicts)
+            st.error(f"❌ **Not saved**: village '{e.village_name}' was updated by someone else in the meantime ({changed}). Click 🔄 Reload Data, review the latest values and try again.")
+        return None
+    except PermissionError:
+        show_villages_permission_error()
+        return None
+    except Exception as e:
+        st.error(f"❌ **Error saving data**: {str(e)}\n\nPlease check if the file is open in another program and try again.")
+        return None
+
+def show_villages_permission_error():
+    """Show detailed help when the villages data cannot be written"""
+    file_path = os.path.abspath(get_storage().location)
+    file_name = os.path.basename(file_path)
+    st.error(f"""
+    ❌ **Permission Denied Error**
+    
+    The file `{file_name}` cannot be saved.
+    
+    **File Location:** `{file_path}`
+    
+    **Possible Causes:**
+    1. The file is open in Excel, Notepad, or another program
+    2. Another Streamlit instance has the file locked
+    3. Antivirus software is scanning the file
+    4. You don't have write permissions
+    
+    **Solutions:**
+    1. ✅ Close Excel/Notepad if `{file_name}` is open
+    2. ✅ Close any other Streamlit instances
+    3. ✅ Check Task Manager for processes using the file
+    4. ✅ Right-click the file → Properties → Uncheck "Read-only" if checked
+    5. ✅ Run Streamlit as Administrator (if permission issue)
+    
+    **Quick Fix:**
+    - Close all programs
+    - Click the 🔄 Reload button
+    - Try updating again
+    """)
+
 def get_status_color(status):
     """Get color code for status"""
     color_map = {
@@ -384,8 +492,180 @@ def get_status_color(status):
 
 def get_phase_order():
     """Get ordered list of phases"""
-    return ['Notification', 'Drone Survey Pending', 'Map 1 awaited', 'Ground Truthing Pending', 'Map 2 awaited',
-            'Pasting', 'Objections Hearing', 'Map 3', 'Card Issuance']
+    return list(PHASE_ORDER)
+
+PAGE_SIZES = [10, 25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 25))
+
+def paginated_table(df, key, search_columns=(), format_page=None, style_page=None, compact=False, height=None):
+    """Show df one page at a time and return the searched, sorted rows.
+    
+    Search, sort and paging run on the server over the whole frame; only the
+    visible page is formatted (format_page), styled (style_page, returning a
+    Styler) and sent to the browser.
+    """
+    with stage(f'table:{key}'):
+        columns = st.columns([3, 2, 1, 1, 1] if not compact else [2, 2, 1, 1, 1])
+        query = ''
+        if search_columns:
+            with columns[0]:
+                query = st.text_input("Search", key=f"{key}_search", placeholder=f"Search {', '.join(search_columns)}")
+        with columns[1]:
+            sort_by = st.selectbox("Sort by", ['(default order)'] + list(df.columns), key=f"{key}_sort")
+        with columns[2]:
+            descending = st.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Descending"
+        page_sizes = sorted(set(PAGE_SIZES + [DEFAULT_PAGE_SIZE]))
+        with columns[3]:
+            page_size = st.selectbox("Rows per page", page_sizes,
+                                     index=page_sizes.index(10 if compact else DEFAULT_PAGE_SIZE), key=f"{key}_size_{compact}")
+    
+        rows = df
+        if query:
+            mask = pd.Series(False, index=rows.index)
+            for col in search_columns:
+                if col in rows.columns:
+                    mask |= rows[col].astype(str).str.contains(query, case=False, regex=False, na=False)
+            rows = rows[mask]
+        if sort_by in rows.columns:
+            # Categorical columns sort in category order, e.g. phases in workflow order
+            rows = rows.sort_values(sort_by, ascending=not descending, kind='stable', na_position='last')
+    
+        pages = max(1, -(-len(rows) // page_size))
+        page_key = f"{key}_page"
+        if st.session_state.get(page_key, 1) > pages:
+            st.session_state[page_key] = pages
+        with columns[4]:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+    
+        start = (page - 1) * page_size
+        view = rows.iloc[start:start + page_size]
+        if format_page is not None:
+            view = format_page(view)
+        # Number rows by their position in the searched and sorted list
+        view = view.set_axis(pd.RangeIndex(start + 1, start + 1 + len(view), name='S.No.'))
+        st.dataframe(style_page(view) if style_page is not None else view,
+                     width='stretch', height=height, hide_index=False)
+        if len(rows):
+            st.caption(f"Showing {start + 1:,}–{start + len(view):,} of {len(rows):,}")
+        else:
+            st.caption("No matching rows")
+        return rows
+
+@st.cache_data(max_entries=32)
+def _figure_json(name, version, _build, _args, _built):
+    record_cache_miss(f'figure:{name}')
+    start = time.perf_counter()
+    spec = _build(*_args).to_json()
+    record_timing(f'figure_build:{name}', time.perf_counter() - start)
+    _built.append(True)
+    return spec
+
+def cached_figure(name, version, build, *args):
+    """Figure from build(*args), built once per data version and shared by all
+    sessions as serialized JSON"""
+    record_cache_call(f'figure:{name}')
+    built = []
+    start = time.perf_counter()
+    spec = _figure_json(name, version, build, args, built)
+    # The spec came out of plotly itself, so skip re-validating it (which
+    # costs about as much as building the figure)
+    fig = go.Figure(json.loads(spec), _validate=False)
+    if not built:
+        record_timing(f'figure_hit:{name}', time.perf_counter() - start)
+    return fig
+
+def build_phase_figure(phase_counts):
+    """Bar chart of villages in each phase"""
+    fig = px.bar(
+        phase_counts,
+        x='Phase',
+        y='Count',
+        title='Villages in Each Phase',
+        color='Count',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+def build_zone_figure(zone_counts):
+    """Pie chart of villages per municipal zone"""
+    return px.pie(
+        zone_counts,
+        values='Count',
+        names='Zone',
+        title='Municipal Zone Distribution',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+
+def build_phase_duration_figure(phase_stats):
+    """Grouped bars of the median and 90th percentile days in each phase"""
+    fig = go.Figure([
+        go.Bar(x=phase_stats['Phase'], y=phase_stats['Median_Days'], name='Median'),
+        go.Bar(x=phase_stats['Phase'], y=phase_stats['P90_Days'], name='90th percentile'),
+    ])
+    fig.update_layout(title='Days Spent in Each Phase', barmode='group',
+                      xaxis_tickangle=-45, yaxis_title='Days')
+    return fig
+
+def build_status_figure(status_counts):
+    """Bar chart of villages per status"""
+    return px.bar(
+        status_counts,
+        x='Status',
+        y='Count',
+        title='Status Distribution',
+        color='Status',
+        color_discrete_map={
+            'Completed': '#28a745',
+            'On Track': '#ffc107',
+            'Behind Schedule': '#dc3545'
+        }
+    )
+
+def build_zone_status_figure(zone_status):
+    """Heatmap of villages per zone and status"""
+    return px.imshow(
+        zone_status.values,
+        labels=dict(x="Status", y="Zone", color="Count"),
+        x=zone_status.columns,
+        y=zone_status.index,
+        title='Zone vs Status Distribution',
+        color_continuous_scale='RdYlGn'
+    )
+
+def build_progress_history_figure(history):
+    """Stacked area chart of villages in each phase per day"""
+    frame = history.rename_axis('Date').reset_index().melt(
+        id_vars='Date', var_name='Phase', value_name='Villages')
+    return px.area(frame, x='Date', y='Villages', color='Phase',
+                   category_orders={'Phase': PHASE_ORDER}, title='Villages in Each Phase over Time')
+
+def is_admin():
+    """Whether this session opened the app with ?admin=<DASHBOARD_ADMIN_TOKEN>"""
+    token = os.environ.get('DASHBOARD_ADMIN_TOKEN', '')
+    given = st.query_params.get('admin', '')
+    return bool(token) and hmac.compare_digest(given.encode('utf-8'), token.encode('utf-8'))
+
+def profiler_panel():
+    """Admin-only rerun latency percentiles, with JSON and Prometheus dumps"""
+    with st.expander("⏱️ Profiler"):
+        if not PROFILING:
+            st.caption("Stage timing is off: start the app with DASHBOARD_PROFILE=1. "
+                       "Only figure builds are timed.")
+        else:
+            st.caption(f"Percentiles over the latest runs of each step (ms), written to `{PROFILE_DIR}`")
+        timings = timing_stats()
+        if timings:
+            st.dataframe(pd.DataFrame(timings).T.round(2).sort_values('p90_ms', ascending=False),
+                         width='stretch')
+        col1, col2 = st.columns(2)
+        col1.download_button("JSON", profile_json(), file_name="profile.json", mime="application/json",
+                             on_click="ignore", width='stretch')
+        col2.download_button("Prometheus", profile_prometheus(), file_name="metrics.prom", mime="text/plain",
+                             on_click="ignore", width='stretch')
+        if st.button("Reset", width='stretch'):
+            reset_cache_stats()
+            st.rerun()
 
 # Initialize data files
 initialize_data_files()
@@ -398,16 +678,27 @@ with st.sidebar:
     st.markdown("### 🔄 Data Refresh")
     st.markdown("---")
     
-    # Reload button section
-    if st.button("🔄 Reload Data", use_container_width=True, type="primary", help="Reload all data from CSV files"):
-        # Clear all cached data
-        load_villages_data.clear()
-        load_progress_data.clear()
-        load_responsibility_data.clear()
-        load_remarks_data.clear()
+    # Reload button section; cached data is re-read automatically when its
+    # source changes, so this only refreshes the page
+    if st.button("🔄 Reload Data", use_container_width=True, type="primary", help="Refresh the page with the latest data"):
         st.rerun()
     
-    st.caption("💡 Click to refresh data after changes")
+    # Filled in by change_feed once the section is known
+    change_feed_slot = st.empty()
+    
+    with st.expander("📈 Cache statistics"):
+        stats = cache_stats()
+        if stats:
+            st.dataframe(pd.DataFrame(stats).T, width='stretch')
+        # Only the figure timings; the other profiler stages are for admins
+        timings = {name: stats for name, stats in timing_stats().items()
+                   if name.startswith(('figure_build:', 'figure_hit:'))}
+        if timings:
+            st.caption("Figure build vs cache hit time (ms)")
+            st.dataframe(pd.DataFrame(timings).T.round(2), width='stretch')
+    
+    if is_admin():
+        profiler_panel()
     
     st.markdown("---")
     
@@ -420,30 +711,218 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
-# Create tabs
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📊 Overview", "👥 Responsibility Matrix", 
-    "💬 Remarks & Help Required", "💾 Data Management"
-])
+# Change feed: every CHANGE_POLL_SECONDS an open page compares the versions
+# of the data its section shows with those it was rendered from, and reruns
+# when one has changed. The rerun only recomputes what depends on the changed
+# data; everything else comes from the caches. Data Management is not rerun
+# under the user, as its forms remember the row versions they were filled
+# from to detect conflicting edits; it shows a notice instead.
+CHANGE_POLL_SECONDS = float(os.environ.get('DASHBOARD_POLL_SECONDS', 5))
+SECTION_DATA = {
+    "📊 Overview": ('villages', 'progress'),
+    "👥 Responsibility Matrix": ('villages', 'responsibility'),
+    "💬 Remarks & Help Required": ('villages', 'remarks'),
+    "💾 Data Management": ('villages',),
+}
+EDITING_SECTIONS = {"💾 Data Management"}
+DATA_LABELS = {
+    'villages': "Village data",
+    'progress': "Phase durations",
+    'responsibility': "Responsibility matrix",
+    'remarks': "Remarks",
+}
+
+def remember_data_versions(max_age=VERSIONS_MAX_AGE):
+    """Record the data versions this session's page is rendered from"""
+    st.session_state['seen_versions'] = data_versions(max_age)
+
+@st.fragment(run_every=CHANGE_POLL_SECONDS or None)
+def change_feed(section):
+    """Rerun the page when data shown by section has changed since it was
+    rendered; in EDITING_SECTIONS only point the change out"""
+    seen = st.session_state.get('seen_versions', {})
+    current = data_versions()
+    changed = [name for name in SECTION_DATA[section] if current[name] != seen.get(name)]
+    if changed and section not in EDITING_SECTIONS:
+        st.rerun()
+    if changed:
+        st.info(f"🔔 {', '.join(DATA_LABELS[name] for name in changed)} changed since this page was loaded. "
+                "Click 🔄 Reload Data to see the latest values.")
+    else:
+        st.caption(f"💡 Changes made by others show up within {CHANGE_POLL_SECONDS:g} seconds")
+
+# Each section is a function and only the selected one runs on a rerun, so
+# interacting with one section does not rebuild the others
+
+# SECTION 1: OVERVIEW
+@st.fragment
+@timed()
+def village_table_panel():
+    """Village progress table with export; the view toggle reruns only this panel"""
+    villages_df = load_villages_with_status()
+    
+    # Village Progress Table
+    st.markdown("### 🏘️ Village Progress Details")
+    
+    # Mobile-friendly view toggle
+    col_view1, col_view2 = st.columns([1, 4])
+    with col_view1:
+        compact_view = st.checkbox("📱 Compact View", help="Optimized view for mobile devices")
+    
+    display_columns = ['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status',
+                      'Last_Updated']
+    
+    # Format dates for display (visible page only)
+    def format_page(page):
+        return page.assign(Last_Updated=page['Last_Updated'].dt.strftime('%Y-%m-%d'))
+    
+    # Color code status
+    def style_status(val):
+        color = get_status_color(val)
+        return f'color: {color}; font-weight: bold'
+    
+    # Optimize for mobile: use container width and adjust height based on view
+    table_height = 300 if compact_view else 400
+    paginated_table(villages_df[display_columns], "villages_table", search_columns=['Village_Name'],
+                    format_page=format_page,
+                    style_page=lambda page: page.style.map(style_status, subset=['Status']),
+                    compact=compact_view, height=table_height)
+    
+    # Export functionality: files are only built when a button is clicked, on
+    # a worker thread, once per data version (see exporter.py)
+    col1, col2 = st.columns(2)
+    with col1:
+        # Export the stored data, typed Status included, as it is re-imported
+        stored_df = load_villages_data()
+        st.download_button(
+            label="📥 Export to CSV",
+            data=lambda: villages_csv(stored_df.attrs.get('version'), stored_df),
+            file_name=f"village_progress_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv",
+            on_click="ignore"
+        )
+    
+    with col2:
+        if excel_available():
+            key = (stored_df.attrs.get('version'), file_signature(PROGRESS_DATA),
+                   file_signature(RESPONSIBILITY_DATA), remarks_signature())
+
+            def excel_export():
+                # The other sheets are only loaded when the workbook is asked for
+                sheets = {
+                    'Villages': stored_df,
+                    'Progress': load_progress_data(),
+                    'Responsibility': load_responsibility_data(),
+                    'Remarks': load_remarks_data(),
+                }
+                return dashboard_xlsx(key, sheets)
+
+            st.download_button(
+                label="📊 Export to Excel",
+                data=excel_export,
+                file_name=f"svamitva_dashboard_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore"
+            )
+        else:
+            st.info("💡 For Excel export, install openpyxl: pip install openpyxl")
+
+BREAKDOWN_LABELS = {
+    'Municipal_Zone': 'Zone',
+    'HDM_JDM': 'Property Tax (HDM/JDM)',
+    'ATP_MTP': 'ATP/MTP',
+    'ARRO_Officer': 'ARRO Officer',
+}
+
+@st.fragment
+@timed()
+def phase_timeline_panel():
+    """Phase durations from the villages' phase dates; the breakdown choice
+    reruns only this panel"""
+    villages_df = load_villages_data()
+    timeline = load_phase_timeline()
+    phase_stats = timeline['phase_stats']
+
+    st.markdown("### ⏱️ Phase Timelines")
+    if not phase_stats['Villages'].any():
+        st.info("No phase dates recorded yet. Durations appear here once villages have "
+                "the dates they entered and left a phase.")
+        return
+
+    expected = load_progress_data()
+    table = phase_stats.round(1)
+    if 'Avg_Duration_Days' in expected.columns:
+        table = table.merge(expected[['Phase', 'Avg_Duration_Days']], on='Phase', how='left')
+    st.dataframe(table.rename(columns={'Mean_Days': 'Mean (days)', 'Median_Days': 'Median (days)',
+                                       'P90_Days': '90th pct (days)', 'Avg_Duration_Days': 'Avg Duration (days)'}),
+                 width='stretch', hide_index=True)
+
+    fig = cached_figure('phase_durations', villages_df.attrs.get('version'),
+                        build_phase_duration_figure, phase_stats)
+    st.plotly_chart(fig, width='stretch')
+
+    breakdowns = timeline['breakdowns']
+    if breakdowns:
+        by = st.selectbox("Median days by", list(breakdowns), format_func=BREAKDOWN_LABELS.get,
+                          key="phase_timeline_breakdown")
+        st.dataframe(breakdowns[by].round(1), width='stretch')
+
+@st.fragment
+@timed()
+def progress_history_panel():
+    """Progress over time and current counts, from the transition log that
+    every dashboard write appends to"""
+    st.markdown("### 📅 Progress over Time")
+    signature = transition_counters.refresh()
+    if signature is None:
+        st.info("No changes recorded yet. Progress over time is charted from the villages "
+                "added, updated or uploaded here from now on.")
+        return
+
+    history = transition_counters.phase_history()
+    fig = cached_figure('progress_history', signature, build_progress_history_figure, history)
+    st.plotly_chart(fig, width='stretch')
+
+    col1, col2, col3 = st.columns(3)
+    for col, by, label in ((col1, 'phase', 'Phase'), (col2, 'zone', 'Zone'), (col3, 'status', 'Status')):
+        counts = pd.Series(transition_counters.counts(by), name='Villages', dtype='int64')
+        if by == 'phase':
+            counts = counts.reindex([p for p in PHASE_ORDER if p in counts.index] +
+                                    [p for p in counts.index if p not in PHASE_ORDER])
+        else:
+            counts = counts.sort_index()
+        col.dataframe(counts.rename_axis(label).reset_index(), width='stretch', hide_index=True)
+    st.caption(f"{transition_counters.transitions:,} change(s) recorded since "
+               f"{transition_counters.since[:10] if transition_counters.since else 'the log started'}")
 
-# Load data
-villages_df = load_villages_data()
-progress_df = load_progress_data()
-responsibility_df = load_responsibility_data()
-remarks_df = load_remarks_data()
+    # Edits made outside the dashboard (a CSV edited by hand) are not in the log
+    villages_df = load_villages_data()
+    in_phase = progress_snapshot.get(villages_df.attrs.get('version'), villages_df)['phases']
+    logged = transition_counters.counts('phase')
+    if any(int(in_phase.get(phase, 0)) != logged.get(phase, 0) for phase in PHASE_ORDER):
+        st.caption("⚠️ The villages data was also changed outside the dashboard; the counts "
+                   "above only follow changes made here.")
 
-# TAB 1: OVERVIEW
-with tab1:
+@timed()
+def render_overview():
+    """Overview metrics, village table and charts"""
+    # Status is computed from the phase dates, not the typed value
+    villages_df = load_villages_with_status()
+    villages_version = villages_df.attrs.get('version')
+    
     st.header("Dashboard Overview")
     
     if not villages_df.empty:
         # Key Metrics
         col1, col2, col3, col4 = st.columns(4)
         
-        total_villages = len(villages_df)
-        survey_completed = len(villages_df[villages_df['Current_Phase'].isin(['Map 1 awaited', 'Ground Truthing Pending', 'Map 2 awaited', 'Pasting', 'Objections Hearing', 'Map 3', 'Card Issuance'])])
-        map2_awaited = len(villages_df[villages_df['Current_Phase'] == 'Map 2 awaited'])
-        ground_truthing = len(villages_df[villages_df['Current_Phase'] == 'Ground Truthing Pending'])
+        # All Overview numbers come from one aggregation per data version,
+        # shared by every session
+        aggregates = overview_snapshot.get(villages_version, villages_df)
+        total_villages = aggregates['total']
+        survey_completed = aggregates['survey_completed']
+        map2_awaited = aggregates['map2_awaited']
+        ground_truthing = aggregates['ground_truthing']
         
         with col1:
             st.metric("Total Villages", total_villages)
@@ -456,56 +935,7 @@ with tab1:
         
         st.markdown("---")
         
-        # Village Progress Table
-        st.markdown("### 🏘️ Village Progress Details")
-        
-        # Mobile-friendly view toggle
-        col_view1, col_view2 = st.columns([1, 4])
-        with col_view1:
-            compact_view = st.checkbox("📱 Compact View", help="Optimized view for mobile devices")
-        
-        display_columns = ['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status',
-                          'Last_Updated']
-        
-        # Format dates for display
-        display_df = villages_df[display_columns].copy()
-        display_df['Last_Updated'] = display_df['Last_Updated'].dt.strftime('%Y-%m-%d')
-        
-        # Reset index to start from 1 instead of 0
-        display_df = display_df.reset_index(drop=True)
-        display_df.index = display_df.index + 1
-        display_df.index.name = 'S.No.'
-        
-        # Color code status
-        def style_status(val):
-            color = get_status_color(val)
-            return f'color: {color}; font-weight: bold'
-        
-        styled_df = display_df.style.map(style_status, subset=['Status'])
-        
-        # Optimize for mobile: use container width and adjust height based on view
-        table_height = 300 if compact_view else 400
-        st.dataframe(
-            styled_df,
-            use_container_width=True,
-            height=table_height,
-            hide_index=False
-        )
-        
-        # Export functionality
-        col1, col2 = st.columns(2)
-        with col1:
-            csv = villages_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Export to CSV",
-                data=csv,
-                file_name=f"village_progress_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        
-        with col2:
-            # Excel export would require openpyxl
-            st.info("💡 For Excel export, install openpyxl: pip install openpyxl")
+        village_table_panel()
         
         st.markdown("---")
         
@@ -513,37 +943,13 @@ with tab1:
         col1, col2 = st.columns(2)
         
         with col1:
-            # Progress by Phase Chart
-            phase_counts = villages_df['Current_Phase'].value_counts().reset_index()
-            phase_counts.columns = ['Phase', 'Count']
-            # Order phases
-            phase_order = get_phase_order()
-            phase_counts['Phase'] = pd.Categorical(phase_counts['Phase'], categories=phase_order, ordered=True)
-            phase_counts = phase_counts.sort_values('Phase')
-            
-            fig_phase = px.bar(
-                phase_counts,
-                x='Phase',
-                y='Count',
-                title='Villages in Each Phase',
-                color='Count',
-                color_continuous_scale='Blues'
-            )
-            fig_phase.update_layout(xaxis_tickangle=-45)
+            # Progress by Phase Chart (already in phase order)
+            fig_phase = cached_figure('phase', villages_version, build_phase_figure, aggregates['phase_counts'])
             st.plotly_chart(fig_phase, width='stretch')
         
         with col2:
             # Zone Distribution Chart
-            zone_counts = villages_df['Municipal_Zone'].value_counts().reset_index()
-            zone_counts.columns = ['Zone', 'Count']
-            
-            fig_zone = px.pie(
-                zone_counts,
-                values='Count',
-                names='Zone',
-                title='Municipal Zone Distribution',
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
+            fig_zone = cached_figure('zone', villages_version, build_zone_figure, aggregates['zone_counts'])
             st.plotly_chart(fig_zone, width='stretch')
         
         st.markdown("---")
@@ -553,40 +959,42 @@ with tab1:
         
         with col1:
             # Status Distribution
-            status_counts = villages_df['Status'].value_counts().reset_index()
-            status_counts.columns = ['Status', 'Count']
-            status_colors = [get_status_color(s) for s in status_counts['Status']]
-            
-            fig_status = px.bar(
-                status_counts,
-                x='Status',
-                y='Count',
-                title='Status Distribution',
-                color='Status',
-                color_discrete_map={
-                    'Completed': '#28a745',
-                    'On Track': '#ffc107',
-                    'Behind Schedule': '#dc3545'
-                }
-            )
+            fig_status = cached_figure('status', villages_version, build_status_figure, aggregates['status_counts'])
             st.plotly_chart(fig_status, width='stretch')
         
         with col2:
             # Zone vs Status Heatmap
-            zone_status = pd.crosstab(villages_df['Municipal_Zone'], villages_df['Status'])
-            
-            fig_heatmap = px.imshow(
-                zone_status.values,
-                labels=dict(x="Status", y="Zone", color="Count"),
-                x=zone_status.columns,
-                y=zone_status.index,
-                title='Zone vs Status Distribution',
-                color_continuous_scale='RdYlGn'
-            )
+            fig_heatmap = cached_figure('heatmap', villages_version, build_zone_status_figure, aggregates['zone_status'])
             st.plotly_chart(fig_heatmap, width='stretch')
+        
+        st.markdown("---")
+        
+        # Completed/Target per phase, counted from the villages data
+        st.markdown("### 📈 Phase Progress")
+        progress_df = load_progress_data()
+        st.dataframe(
+            progress_df[['Phase', 'Completed', 'Target']],
+            column_config={'Completed': st.column_config.ProgressColumn(
+                'Completed', format='%d', min_value=0, max_value=max(total_villages, 1))},
+            width='stretch',
+            hide_index=True
+        )
+        
+        st.markdown("---")
+        
+        phase_timeline_panel()
+        
+        st.markdown("---")
+        
+        progress_history_panel()
 
-# TAB 2: RESPONSIBILITY MATRIX
-with tab2:
+# SECTION 2: RESPONSIBILITY MATRIX
+@timed()
+def render_responsibility_matrix():
+    """Phase responsibilities and contact directory"""
+    villages_df = load_villages_data()
+    responsibility_df = load_responsibility_data()
+    
     st.header("Phase-wise Responsibility Matrix")
     
     if not responsibility_df.empty:
@@ -673,12 +1081,14 @@ with tab2:
         with col2:
             st.info("📞 MCL Office")
 
-# TAB 3: REMARKS & HELP REQUIRED
-with tab3:
-    st.header("Remarks & Help Required")
-    st.markdown("Officials can submit remarks and request help from higher officials regarding their responsibilities.")
-    
-    st.markdown("---")
+# SECTION 3: REMARKS & HELP REQUIRED
+# Each panel is a fragment: its widgets rerun only that panel, and the whole
+# app reruns only after a save changes shared data
+@st.fragment
+@timed()
+def remarks_form_panel():
+    """Form to submit a new remark / help request"""
+    villages_df = load_villages_data()
     
     # Submit new remark/help request
     st.subheader("📝 Submit New Remark / Help Request")
@@ -701,7 +1111,7 @@ with tab3:
         with col2:
             village_list = ['All']
             if not villages_df.empty:
-                village_list.extend(villages_df['Village_Name'].dropna().unique().tolist())
+                village_list.extend(villages_df.index.tolist())
             village = st.selectbox("Village (if applicable)", village_list)
             help_required = st.selectbox("Type of Help Required", [
                 "General Query",
@@ -732,87 +1142,105 @@ with tab3:
                     'Response': ''
                 }
                 
-                current_remarks_df = load_remarks_data()
-                new_df = pd.concat([current_remarks_df, pd.DataFrame([new_remark])], ignore_index=True)
-                
-                if save_remarks_data(new_df):
+                if add_remark(new_remark):
                     st.success("✅ Your remark/help request has been submitted successfully!")
+                    # Shared data changed: rerun the whole app so the list and
+                    # response panels pick it up
                     st.rerun()
             else:
                 st.error("Please fill in all required fields (marked with *)")
-    
-    st.markdown("---")
-    
+
+@st.fragment
+@timed()
+def remarks_list_panel():
+    """Filterable list of submitted remarks"""
     # Display existing remarks
     st.subheader("📋 Submitted Remarks & Help Requests")
     
     current_remarks_df = load_remarks_data()
     
     if not current_remarks_df.empty:
+        # Filter options and lookups come from the shared index of this
+        # version of the remarks, built once for all sessions
+        index = remarks_index_snapshot.get(current_remarks_df.attrs.get('version'), current_remarks_df)
+        
         # Filters
         col1, col2, col3 = st.columns(3)
         with col1:
-            filter_department = st.selectbox("Filter by Department", 
-                                            ['All'] + current_remarks_df['Department'].unique().tolist() if 'Department' in current_remarks_df.columns else ['All'])
+            filter_department = st.selectbox("Filter by Department", ['All'] + index.options('Department'))
         with col2:
-            filter_status = st.selectbox("Filter by Status", 
-                                        ['All'] + current_remarks_df['Status'].unique().tolist() if 'Status' in current_remarks_df.columns else ['All'])
+            filter_status = st.selectbox("Filter by Status", ['All'] + index.options('Status'))
         with col3:
-            filter_help = st.selectbox("Filter by Help Type", 
-                                      ['All'] + current_remarks_df['Help_Required'].unique().tolist() if 'Help_Required' in current_remarks_df.columns else ['All'])
+            filter_help = st.selectbox("Filter by Help Type", ['All'] + index.options('Help_Required'))
+        col4, col5, col6 = st.columns(3)
+        with col4:
+            filter_village = st.selectbox("Filter by Village", ['All'] + index.options('Village'))
+        with col5:
+            filter_phase = st.selectbox("Filter by Phase", ['All'] + index.options('Phase'))
+        with col6:
+            date_range = st.date_input("Filter by Date", value=(), help="Pick a start and an end date")
+        search_text = st.text_input("🔍 Search remarks and responses",
+                                    placeholder="Words or word beginnings, e.g. drone delay")
         
         # Apply filters
-        filtered_remarks = current_remarks_df.copy()
-        if filter_department != 'All':
-            filtered_remarks = filtered_remarks[filtered_remarks['Department'] == filter_department]
-        if filter_status != 'All':
-            filtered_remarks = filtered_remarks[filtered_remarks['Status'] == filter_status]
-        if filter_help != 'All':
-            filtered_remarks = filtered_remarks[filtered_remarks['Help_Required'] == filter_help]
+        filters = {field: value for field, value in [('Department', filter_department), ('Status', filter_status),
+                                                     ('Help_Required', filter_help), ('Village', filter_village),
+                                                     ('Phase', filter_phase)] if value != 'All'}
+        date_from = date_range[0] if len(date_range) > 0 else None
+        date_to = date_range[1] if len(date_range) > 1 else date_from
+        filtered_remarks = index.search(filters, search_text, date_from, date_to)
         
         # Display remarks
         if not filtered_remarks.empty:
-            # Format date for display
-            display_remarks = filtered_remarks.copy()
-            if 'Date' in display_remarks.columns:
-                display_remarks['Date'] = display_remarks['Date'].dt.strftime('%Y-%m-%d %H:%M')
+            # Format date for display (visible page only)
+            def format_page(page):
+                if 'Date' in page.columns:
+                    page = page.assign(Date=page['Date'].dt.strftime('%Y-%m-%d %H:%M'))
+                return page
             
             # Reorder columns for better display
             display_columns = ['Date', 'Official_Name', 'Department', 'Phase', 'Village', 'Help_Required', 'Remarks', 'Status', 'Response']
-            available_columns = [col for col in display_columns if col in display_remarks.columns]
-            display_remarks = display_remarks[available_columns]
+            available_columns = [col for col in display_columns if col in filtered_remarks.columns]
             
-            st.dataframe(display_remarks, use_container_width=True, height=400)
+            paginated_table(filtered_remarks[available_columns], "remarks_table",
+                            format_page=format_page, height=400)
             
-            # Export functionality
-            csv = filtered_remarks.to_csv(index=False).encode('utf-8')
+            # Export functionality: written on click, once per remarks
+            # version and filters (see exporter.py)
+            export_key = (current_remarks_df.attrs.get('version'), sorted(filters.items()),
+                          search_text, date_from, date_to)
             st.download_button(
                 label="📥 Export Remarks to CSV",
-                data=csv,
+                data=lambda: remarks_csv(export_key, filtered_remarks),
                 file_name=f"remarks_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                mime="text/csv",
+                on_click="ignore"
             )
         else:
             st.info("No remarks match the selected filters.")
     else:
         st.info("No remarks submitted yet. Use the form above to submit your first remark or help request.")
-    
-    st.markdown("---")
-    
+
+@st.fragment
+@timed()
+def remarks_response_panel():
+    """Responses from higher officials to pending remarks"""
     # Response section for higher officials
     st.subheader("💼 Response from Higher Officials")
     st.markdown("Higher officials can provide responses to submitted remarks.")
     
+    current_remarks_df = load_remarks_data()
+    
     if not current_remarks_df.empty:
         pending_remarks = current_remarks_df[current_remarks_df['Status'] == 'Pending'] if 'Status' in current_remarks_df.columns else current_remarks_df
         
         if not pending_remarks.empty:
-            remark_options = {idx: f"{row['Official_Name']} - {row['Department']} - {row['Date'].strftime('%Y-%m-%d') if pd.notna(row['Date']) else 'N/A'}" 
-                            for idx, row in pending_remarks.iterrows()}
+            remark_options = {row['Remark_ID']: f"{row['Official_Name']} - {row['Department']} - {row['Date'].strftime('%Y-%m-%d') if pd.notna(row['Date']) else 'N/A'}" 
+                            for _, row in pending_remarks.iterrows()}
             
-            selected_remark_idx = st.selectbox("Select Remark to Respond", 
-                                                options=list(remark_options.keys()),
-                                                format_func=lambda x: remark_options[x])
+            selected_remark_id = st.selectbox("Select Remark to Respond", 
+                                               options=list(remark_options.keys()),
+                                               format_func=lambda x: remark_options[x])
             
             col1, col2 = st.columns(2)
             with col1:
@@ -821,23 +1249,40 @@ with tab3:
                 response_text = st.text_area("Response", placeholder="Enter your response...")
             
             if st.button("Submit Response"):
-                current_remarks_df.loc[selected_remark_idx, 'Status'] = response_status
-                current_remarks_df.loc[selected_remark_idx, 'Response'] = response_text
-                
-                if save_remarks_data(current_remarks_df):
+                if respond_to_remark(selected_remark_id, response_status, response_text):
                     st.success("✅ Response submitted successfully!")
+                    # Shared data changed: rerun the whole app
                     st.rerun()
         else:
             st.info("No pending remarks to respond to.")
 
-# TAB 4: DATA MANAGEMENT
-with tab4:
-    st.header("Data Management")
+@timed()
+def render_remarks():
+    """Remarks form, list of remarks and responses"""
+    st.header("Remarks & Help Required")
+    st.markdown("Officials can submit remarks and request help from higher officials regarding their responsibilities.")
     
-    # Warning about file access
-    st.info("⚠️ **Important**: Make sure `villages_data.csv` is NOT open in Excel or any other program when updating data. Close the file first to avoid permission errors.")
+    st.markdown("---")
     
-    st.subheader("Manual Village Data Update")
+    remarks_form_panel()
+    
+    st.markdown("---")
+    
+    remarks_list_panel()
+    
+    st.markdown("---")
+    
+    remarks_response_panel()
+
+# SECTION 4: DATA MANAGEMENT
+STATUS_HELP = ("The dashboard shows the status computed from the phase dates; "
+               "this value is used only for villages without the date they entered their current phase.")
+
+@st.fragment
+@timed()
+def add_village_panel():
+    """Form to add a new village"""
+    villages_version = villages_data_version()
     
     # Add new village form
     with st.expander("Add New Village", expanded=False):
@@ -848,7 +1293,8 @@ with tab4:
                 new_village_name = st.text_input("Village Name *")
                 new_zone = st.selectbox("Municipal Zone *", ['A', 'B', 'C', 'D'])
                 new_phase = st.selectbox("Current Phase *", get_phase_order())
-                new_status = st.selectbox("Status *", ['Completed', 'On Track', 'Behind Schedule'])
+                new_status = st.selectbox("Status *", ['Completed', 'On Track', 'Behind Schedule'],
+                                          help=STATUS_HELP)
             
             with col2:
                 new_hdm_jdm = st.text_input("Property Tax")
@@ -860,7 +1306,6 @@ with tab4:
             if submitted:
                 if new_village_name and new_zone and new_phase and new_status:
                     new_row = {
-                        'Village_Name': new_village_name,
                         'Municipal_Zone': new_zone,
                         'Current_Phase': new_phase,
                         'Status': new_status,
@@ -881,26 +1326,31 @@ with tab4:
                         'Cards_Issued_Date': None
                     }
                     
-                    villages_df = load_villages_data()
-                    new_df = pd.concat([villages_df, pd.DataFrame([new_row])], ignore_index=True)
-                    
-                    if save_villages_data(new_df):
+                    # expected_version=0: only insert if the village does not exist yet
+                    if save_village(new_village_name, new_row, expected_version=0, loaded_version=villages_version):
                         st.success(f"Village '{new_village_name}' added successfully!")
+                        # Shared data changed: rerun the whole app
                         st.rerun()
                 else:
                     st.error("Please fill in all required fields (marked with *)")
-    
-    st.markdown("---")
+
+@st.fragment
+@timed()
+def update_village_panel():
+    """Edit phase, status, zone and contacts of one village"""
+    villages_df = load_villages_data()
+    villages_version = villages_df.attrs.get('version')
     
     # Update existing village
     st.subheader("Update Existing Village")
     
     if not villages_df.empty:
-        village_list = villages_df['Village_Name'].tolist()
+        village_list = villages_df.index.tolist()
         selected_village = st.selectbox("Select Village to Update", village_list)
         
         if selected_village:
-            village_data = villages_df[villages_df['Village_Name'] == selected_village].iloc[0]
+            # villages_df is indexed by Village_Name
+            village_data = villages_df.loc[selected_village]
             
             col1, col2 = st.columns(2)
             
@@ -908,7 +1358,8 @@ with tab4:
                 updated_phase = st.selectbox("Current Phase", get_phase_order(), 
                                             index=get_phase_order().index(village_data['Current_Phase']) if village_data['Current_Phase'] in get_phase_order() else 0)
                 updated_status = st.selectbox("Status", ['Completed', 'On Track', 'Behind Schedule'],
-                                            index=['Completed', 'On Track', 'Behind Schedule'].index(village_data['Status']) if village_data['Status'] in ['Completed', 'On Track', 'Behind Schedule'] else 1)
+                                            index=['Completed', 'On Track', 'Behind Schedule'].index(village_data['Status']) if village_data['Status'] in ['Completed', 'On Track', 'Behind Schedule'] else 1,
+                                            help=STATUS_HELP)
                 updated_zone = st.selectbox("Municipal Zone", ['A', 'B', 'C', 'D'],
                                           index=['A', 'B', 'C', 'D'].index(village_data['Municipal_Zone']) if village_data['Municipal_Zone'] in ['A', 'B', 'C', 'D'] else 0)
             
@@ -917,51 +1368,116 @@ with tab4:
                 updated_atp = st.text_input("ATP/MTP", value=str(village_data['ATP_MTP']) if pd.notna(village_data['ATP_MTP']) else '')
             
             if st.button("Update Village"):
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'Current_Phase'] = updated_phase
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'Status'] = updated_status
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'Municipal_Zone'] = updated_zone
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'HDM_JDM'] = updated_hdm
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'ATP_MTP'] = updated_atp
-                villages_df.loc[villages_df['Village_Name'] == selected_village, 'Last_Updated'] = pd.to_datetime(datetime.now())
+                # Only the edited village is written back
+                updated_row = {
+                    'Current_Phase': updated_phase,
+                    'Status': updated_status,
+                    'Municipal_Zone': updated_zone,
+                    'HDM_JDM': updated_hdm,
+                    'ATP_MTP': updated_atp,
+                    'Last_Updated': pd.to_datetime(datetime.now())
+                }
                 
-                if save_villages_data(villages_df):
-                    st.success(f"Village '{selected_village}' updated successfully!")
+                base = {col: village_data[col] for col in ['Current_Phase', 'Status', 'Municipal_Zone', 'HDM_JDM', 'ATP_MTP']}
+                result = save_village(selected_village, updated_row, expected_version=village_data.get(VERSION_COLUMN, 0), base=base,
+                                      previous=village_data.to_dict(), loaded_version=villages_version)
+                if result:
+                    _, merged = result
+                    if merged:
+                        st.success(f"Village '{selected_village}' updated successfully (merged with changes saved by someone else)!")
+                    else:
+                        st.success(f"Village '{selected_village}' updated successfully!")
+                    # Shared data changed: rerun the whole app
                     st.rerun()
-    
-    st.markdown("---")
-    
+
+@st.fragment
+@timed()
+def bulk_upload_panel():
+    """Validate an uploaded CSV chunk by chunk, preview the changes and apply them"""
     # Bulk CSV Upload
     st.subheader("Bulk CSV Upload")
     
     uploaded_file = st.file_uploader("Upload CSV file", type=['csv'])
+    mode = st.radio("Import mode", ["Merge (add and update villages)", "Replace (also remove villages missing from the file)"],
+                    horizontal=True)
+    replace = mode.startswith("Replace")
     
     if uploaded_file is not None:
+        villages_df = load_villages_data()
         try:
-            uploaded_df = pd.read_csv(uploaded_file)
-            
-            st.write("Preview of uploaded data:")
-            st.dataframe(uploaded_df.head())
-            
-            if st.button("Replace Existing Data"):
-                # Validate required columns
-                required_columns = ['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status']
-                if all(col in uploaded_df.columns for col in required_columns):
-                    # Convert date columns
-                    date_columns = ['Last_Updated', 'Survey_Date', 'Notification_Date', 'Drone_Survey_Date',
-                                   'Map1_Date', 'Ground_Truthing_Date', 'Map2_Date', 'Pasting_Start_Date',
-                                   'Objections_Date', 'Map3_Date', 'Cards_Issued_Date']
-                    for col in date_columns:
-                        if col in uploaded_df.columns:
-                            uploaded_df[col] = pd.to_datetime(uploaded_df[col], errors='coerce', format='mixed')
-                    
-                    if save_villages_data(uploaded_df):
-                        st.success("Data uploaded successfully!")
-                        st.rerun()
-                else:
-                    st.error(f"CSV must contain these columns: {', '.join(required_columns)}")
-        
+            # Scanning the whole file is the expensive part; keep the report
+            # until the file, the mode or the villages change
+            scan_key = (uploaded_file.file_id, replace, villages_df.attrs.get('version'))
+            if st.session_state.get('upload_scan_key') != scan_key:
+                st.session_state.upload_scan = scan_upload(uploaded_file, villages_df, replace)
+                st.session_state.upload_scan_key = scan_key
+            report = st.session_state.upload_scan
         except Exception as e:
             st.error(f"Error reading CSV file: {str(e)}")
+            return
+        
+        st.write("Preview of uploaded data:")
+        st.dataframe(report['preview'])
+        
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Rows", report['rows'])
+        col2.metric("New", report['inserts'])
+        col3.metric("Changed", report['updates'])
+        col4.metric("Unchanged", report['unchanged'])
+        col5.metric("Removed", report['deletes'])
+        
+        if report['invalid_rows']:
+            st.warning(f"⚠️ {report['invalid_rows']} row(s) have errors and will not be imported.")
+            with st.expander(f"Row errors (first {len(report['errors'])})", expanded=True):
+                st.dataframe(pd.DataFrame(report['errors']), hide_index=True)
+        if report['changes']:
+            with st.expander("Changed values"):
+                st.dataframe(pd.DataFrame(report['changes']), hide_index=True)
+        if report['new_villages']:
+            with st.expander("New villages"):
+                st.write(", ".join(map(str, report['new_villages'])))
+        if report['removed_villages']:
+            with st.expander("Villages that will be removed"):
+                st.write(", ".join(map(str, report['removed_villages'])))
+        
+        if report['inserts'] + report['updates'] + report['deletes'] == 0:
+            st.info("The uploaded file matches the current data; there is nothing to import.")
+        elif st.button("Apply Import"):
+            applied = import_villages_upload(uploaded_file, villages_df, replace)
+            if applied:
+                st.success(f"Imported: {applied['inserts']} new, {applied['updates']} changed, {applied['deletes']} removed.")
+                # Shared data changed: rerun the whole app
+                st.rerun()
+
+@timed()
+def render_data_management():
+    """Add, update and bulk upload village data"""
+    villages_df = load_villages_data()
+    
+    st.header("Data Management")
+    
+    # Warning about file access
+    if get_storage().name == 'csv':
+        st.info("⚠️ **Important**: Make sure `villages_data.csv` is NOT open in Excel or any other program when updating data. Close the file first to avoid permission errors.")
+    
+    # Village names are the key; the loader keeps one row per name
+    duplicates = villages_df.attrs.get('duplicate_villages', [])
+    if duplicates:
+        st.warning(f"⚠️ Duplicate village names found, only the last row of each is used: {', '.join(map(str, duplicates))}")
+    if villages_df.attrs.get('unnamed_villages'):
+        st.warning(f"⚠️ {villages_df.attrs['unnamed_villages']} row(s) without a village name are ignored.")
+    
+    st.subheader("Manual Village Data Update")
+    
+    add_village_panel()
+    
+    st.markdown("---")
+    
+    update_village_panel()
+    
+    st.markdown("---")
+    
+    bulk_upload_panel()
     
     st.markdown("---")
     
@@ -980,5 +1496,30 @@ with tab4:
         with col3:
             st.metric("Data Last Updated", villages_df['Last_Updated'].max().strftime('%Y-%m-%d') if pd.notna(villages_df['Last_Updated'].max()) else 'N/A')
         
-        st.info("💡 Data is automatically saved to CSV files. Make sure you have write permissions.")
+        st.info(f"💡 Data is automatically saved to `{get_storage().location}`. Make sure you have write permissions.")
+
+# Section navigation; the selection lives in session state so it survives reruns
+SECTIONS = {
+    "📊 Overview": render_overview,
+    "👥 Responsibility Matrix": render_responsibility_matrix,
+    "💬 Remarks & Help Required": render_remarks,
+    "💾 Data Management": render_data_management,
+}
+
+selected_section = st.radio(
+    "Section",
+    list(SECTIONS.keys()),
+    horizontal=True,
+    key="nav_section",
+    label_visibility="collapsed"
+)
+# Recorded before rendering, so a write landing meanwhile shows up at the next check
+remember_data_versions()
+SECTIONS[selected_section]()
+if CHANGE_POLL_SECONDS:
+    with change_feed_slot.container():
+        change_feed(selected_section)
 
+if PROFILING:
+    record_timing(f"rerun:{SECTIONS[selected_section].__name__}", time.perf_counter() - _rerun_started)
+    write_profile()
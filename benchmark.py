@@ -0,0 +1,507 @@
+"""Benchmarks for the dashboard on synthetic villages data.
+
+    python benchmark.py                 # data layer, 100,000 villages
+    python benchmark.py --villages 10000 --repeat 5
+    python benchmark.py --app           # app.py sessions at 1k/10k/100k villages
+    python benchmark.py --app --sizes 10000 --baseline baseline.json
+    python benchmark.py --cluster --workers 1 2 4 --users 8
+
+Writes a synthetic villages CSV to a temporary directory and compares the
+original load (every column inferred, dates parsed with format='mixed')
+with the typed schema applied by storage.apply_village_schema, then a
+cold-start load from the CSV with one from its Arrow snapshot, remarks
+filtering with boolean masks with the remarks index, the phase timeline and
+the computed schedule status.
+
+With --app it drives app.py through a typical session with Streamlit's
+AppTest at each size and reports the latency and peak Python memory of every
+interaction, optionally failing when one is slower than in a saved baseline.
+
+With --cluster it serves app.py on 10,000 synthetic villages through
+cluster.py with each number of workers, keeps --users websocket sessions
+rerunning the Overview back to back for --duration seconds, and reports the
+reruns per second and their latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import storage
+from analytics import classify_status, compute_phase_timeline
+from remarks_index import RemarksIndex
+from storage import (
+    VILLAGE_COLUMNS, VILLAGE_DATE_COLUMNS, VILLAGE_CSV_DTYPES, PHASE_ORDER,
+    STATUS_OPTIONS, ZONE_OPTIONS, CSV_ENGINE, CSVBackend, apply_village_schema, read_villages_csv,
+)
+
+
+# Typical days in each phase, as in the sample progress_data.csv
+PHASE_DAYS = [0, 25, 15, 30, 20, 90, 60, 30, 45]
+# Share of villages in each phase: most are early in the workflow
+PHASE_SHARE = [0.05, 0.25, 0.15, 0.2, 0.12, 0.1, 0.06, 0.04, 0.03]
+# Date column set when a village enters each phase (the first two share one)
+PHASE_ENTRY_DATES = ['Notification_Date', 'Notification_Date', 'Drone_Survey_Date', 'Map1_Date',
+                     'Ground_Truthing_Date', 'Pasting_Start_Date', 'Objections_Date', 'Map3_Date',
+                     'Cards_Issued_Date']
+SURNAMES = ['Sharma', 'Kumar', 'Patel', 'Singh', 'Verma', 'Reddy', 'Gupta', 'Iyer', 'Joshi', 'Rao',
+            'Desai', 'Nair']
+
+
+def synthetic_villages(n, seed=0, odd_dates=0.01, today='2025-06-01'):
+    """n villages with the columns of the sample data in initialize_data_files.
+
+    Villages are spread over the phases as in PHASE_SHARE and carry the dates
+    of every phase they have reached, each phase lasting around PHASE_DAYS
+    and the latest date falling before today. A fraction odd_dates of the
+    dates are written day-first instead of ISO, like hand-edited files.
+    """
+    rng = np.random.default_rng(seed)
+    officers = [f"{title} {name} {i}" for i, (title, name) in
+                enumerate((t, s) for t in ('Mr.', 'Ms.') for s in SURNAMES for _ in range(9))]
+    phase = rng.choice(len(PHASE_ORDER), n, p=PHASE_SHARE)
+    # Days from notification to entering each phase, then back from today
+    spent = rng.gamma(4.0, np.array(PHASE_DAYS, dtype=float) / 4.0, (n, len(PHASE_ORDER)))
+    entered = np.concatenate([np.zeros((n, 1)), np.cumsum(spent[:, :-1], axis=1)], axis=1)
+    since = entered[np.arange(n), phase] + rng.integers(0, 60, n)
+    notified = pd.Timestamp(today) - pd.to_timedelta(since.round(), unit='D')
+    dates = {}
+    for code, col in enumerate(PHASE_ENTRY_DATES):
+        if col in dates:
+            continue
+        days = pd.to_timedelta(entered[:, code].round(), unit='D')
+        dates[col] = pd.Series(notified + days).where(phase >= code)
+    # Map 2 arrives when Pasting can start
+    dates['Map2_Date'] = dates['Pasting_Start_Date']
+    dates['Survey_Date'] = dates['Drone_Survey_Date']
+    dates['Last_Updated'] = pd.Series(notified + pd.to_timedelta(entered[np.arange(n), phase].round(), unit='D'))
+
+    df = pd.DataFrame({
+        'Village_Name': [f"Village {i}" for i in range(n)],
+        'Municipal_Zone': rng.choice(ZONE_OPTIONS, n),
+        'Current_Phase': np.array(PHASE_ORDER)[phase],
+        'Status': rng.choice(STATUS_OPTIONS, n, p=[0.1, 0.6, 0.3]),
+        'HDM_JDM': rng.choice(officers, n),
+        'ATP_MTP': rng.choice(officers, n),
+        'ARRO_Officer': np.where(phase >= 6, rng.choice(officers, n), ''),
+        'Total_Properties': rng.integers(50, 5000, n),
+    })
+    for col in VILLAGE_DATE_COLUMNS:
+        values = dates[col]
+        text = values.dt.strftime('%Y-%m-%d %H:%M:%S' if col == 'Last_Updated' else '%Y-%m-%d')
+        odd = (rng.random(n) < odd_dates) & values.notna().to_numpy()
+        text[odd] = values[odd].dt.strftime('%d/%m/%Y')
+        df[col] = text.fillna('')
+    return df[VILLAGE_COLUMNS]
+
+
+def synthetic_remarks(n, seed=0, villages=3000):
+    """n remarks spread over 600 days about the first villages synthetic
+    villages, each a dozen words from a 5,000-word vocabulary"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"word{i}" for i in range(5000)] + ['drone', 'survey', 'delay', 'map', 'objection'])
+    return pd.DataFrame({
+        'Remark_ID': [f"r{i}" for i in range(n)],
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 600 * 24, n), unit='h'),
+        'Official_Name': rng.choice([f"Official {i}" for i in range(300)], n),
+        'Department': rng.choice(['Municipal Corporation', 'Revenue', 'Survey of India', 'Other'], n),
+        'Phase': rng.choice(PHASE_ORDER, n),
+        'Village': rng.choice([f"Village {i}" for i in range(villages)], n),
+        'Remarks': [' '.join(words) for words in rng.choice(vocabulary, (n, 12))],
+        'Help_Required': rng.choice(['Technical Support', 'Administrative', 'None'], n),
+        'Status': rng.choice(['Pending', 'In Progress', 'Resolved'], n),
+        'Response': '',
+    })
+
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+APP_SIZES = [1_000, 10_000, 100_000]
+CLUSTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cluster.py')
+CLUSTER_WORKERS = [1, 2, 4]
+CLUSTER_VILLAGES = 10_000
+REMARKS_PER_VILLAGE = 2
+
+
+def load_original(path):
+    """The load as it was before the typed schema"""
+    df = pd.read_csv(path)
+    for col in VILLAGE_DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
+    return df
+
+
+def load_typed_c(path):
+    """Typed schema with pandas' own parser, to separate the two gains"""
+    return apply_village_schema(pd.read_csv(path, dtype=VILLAGE_CSV_DTYPES))
+
+
+def load_typed(path):
+    """The load CSVBackend does now"""
+    return apply_village_schema(read_villages_csv(path))
+
+
+def best_of(repeat, func, *args):
+    """(best seconds, last result) of repeat calls"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_load(villages, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'villages_data.csv')
+        synthetic_villages(villages).to_csv(path, index=False)
+        print(f"{villages:,} villages, {os.path.getsize(path) / 2**20:.1f} MiB CSV, best of {repeat}")
+        rows = []
+        loaders = [('original (mixed dates)', load_original), ('typed schema, C parser', load_typed_c),
+                   (f'typed schema, {CSV_ENGINE} parser', load_typed)]
+        for label, loader in loaders:
+            seconds, df = best_of(repeat, loader, path)
+            rows.append({'Load': label, 'Seconds': round(seconds, 3),
+                         'Memory (MiB)': round(df.memory_usage(deep=True).sum() / 2**20, 1)})
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+def bench_cold_start(villages, repeat):
+    """First load in a new process: parsing the CSV vs mapping the snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'villages_data.csv')
+        synthetic_villages(villages).to_csv(path, index=False)
+        # Keep the benchmark's snapshots out of the real data directory
+        storage.SNAPSHOT_DIR = os.path.join(tmp, '.snapshots')
+        backend = CSVBackend(path)
+
+        def parse():
+            if os.path.exists(storage.SNAPSHOT_DIR):
+                for name in os.listdir(storage.SNAPSHOT_DIR):
+                    os.remove(os.path.join(storage.SNAPSHOT_DIR, name))
+            return backend.load_villages()
+
+        parse_seconds, _ = best_of(repeat, parse)
+        snapshot_seconds, _ = best_of(repeat, backend.load_villages)
+        print(f"cold start, {villages:,} villages: CSV parse + snapshot write {parse_seconds:.3f} s, "
+              f"snapshot load {snapshot_seconds:.3f} s")
+
+
+def bench_remarks_search(remarks, repeat):
+    """Remarks filters: chained boolean masks vs RemarksIndex"""
+    df = synthetic_remarks(remarks)
+    started = time.perf_counter()
+    index = RemarksIndex(df)
+    print(f"{remarks:,} remarks: index built in {time.perf_counter() - started:.2f} s")
+
+    def masks(filters, text):
+        rows = df
+        for field, value in filters.items():
+            rows = rows[rows[field] == value]
+        for word in text.split():
+            rows = rows[rows['Remarks'].str.contains(r'\b' + word, case=False, regex=True)]
+        return rows
+
+    queries = [({'Department': 'Revenue', 'Status': 'Pending'}, ''),
+               ({'Village': 'Village 17'}, 'drone'),
+               ({}, 'delay sur')]
+    rows = []
+    for filters, text in queries:
+        mask_seconds, expected = best_of(repeat, masks, filters, text)
+        index_seconds, found = best_of(repeat, index.search, filters, text)
+        assert found.index.equals(expected.index)
+        rows.append({'Query': ', '.join(list(filters.values()) + ([repr(text)] if text else [])),
+                     'Matches': len(found), 'Masks (ms)': round(mask_seconds * 1000, 1),
+                     'Index (ms)': round(index_seconds * 1000, 1)})
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def bench_phase_timeline(villages, repeat):
+    """Phase durations, percentiles and breakdowns from the typed villages frame"""
+    df = apply_village_schema(synthetic_villages(villages).replace('', None))
+    seconds, timeline = best_of(repeat, compute_phase_timeline, df)
+    observed = int(timeline['phase_stats']['Villages'].sum())
+    print(f"phase timeline, {villages:,} villages ({observed:,} phase durations): {seconds:.3f} s")
+    expected = {'Drone Survey Pending': 25, 'Map 1 awaited': 15, 'Pasting': 90}
+    seconds, _ = best_of(repeat, classify_status, df, expected, pd.Timestamp('2025-06-01'))
+    print(f"schedule status, {villages:,} villages: {seconds:.3f} s")
+
+
+def _by_label(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise KeyError(label)
+
+
+def synthetic_upload(villages_df, seed=1):
+    """Bulk upload CSV bytes: 5% of the villages moved on one phase, plus 1% new villages"""
+    moved = villages_df.sample(frac=0.05, random_state=seed)
+    phase = np.minimum(pd.Categorical(moved['Current_Phase'], categories=PHASE_ORDER).codes + 1, len(PHASE_ORDER) - 1)
+    moved = moved.assign(Current_Phase=np.array(PHASE_ORDER)[phase])
+    new = synthetic_villages(max(1, len(villages_df) // 100), seed=seed + 1)
+    new = new.assign(Village_Name=[f"New village {i}" for i in range(len(new))])
+    return pd.concat([moved, new]).to_csv(index=False).encode('utf-8')
+
+
+def app_interactions(at, villages_df):
+    """(label, action) for each step of a typical session; each action
+    changes widgets of the AppTest at and reruns it"""
+    def goto(section):
+        def action():
+            at.session_state['nav_section'] = section
+            at.run()
+        return action
+
+    def filter_remarks():
+        _by_label(at.selectbox, 'Filter by Department').set_value('Revenue')
+        _by_label(at.text_input, '🔍 Search remarks and responses').input('delay')
+        at.run()
+
+    def update_village():
+        _by_label(at.selectbox, 'Current Phase').set_value('Pasting')
+        _by_label(at.button, 'Update Village').click().run()
+
+    upload = synthetic_upload(villages_df)
+    return [
+        ('open Overview (cold start)', at.run),
+        ('Overview rerun', at.run),
+        ('village table: page 2', lambda: at.number_input(key='villages_table_page').set_value(2).run()),
+        ('open Remarks', goto('💬 Remarks & Help Required')),
+        ('filter remarks', filter_remarks),
+        ('open Data Management', goto('💾 Data Management')),
+        ('select village', lambda: _by_label(at.selectbox, 'Select Village to Update').set_value('Village 1').run()),
+        ('update village', update_village),
+        ('bulk upload: validate', lambda: at.file_uploader[0].set_value(('upload.csv', upload, 'text/csv')).run()),
+        ('bulk upload: apply', lambda: _by_label(at.button, 'Apply Import').click().run()),
+        ('open Overview after writes', goto('📊 Overview')),
+    ]
+
+
+def run_app_session(villages, trace):
+    """Drive app.py through app_interactions on synthetic data in
+    storage.DATA_DIR; runs in its own process (see bench_app). Returns
+    one row per interaction with its latency and, with trace, the peak
+    Python memory allocated during it."""
+    from streamlit.testing.v1 import AppTest
+
+    villages_df = synthetic_villages(villages)
+    villages_df.to_csv(storage.VILLAGES_DATA, index=False)
+    synthetic_remarks(villages * REMARKS_PER_VILLAGE, villages=villages).to_csv(storage.REMARKS_DATA, index=False)
+    at = AppTest.from_file(APP, default_timeout=600)
+    if trace:
+        tracemalloc.start()
+    rows = []
+    for label, action in app_interactions(at, villages_df):
+        if trace:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        action()
+        row = {'Interaction': label, 'ms': (time.perf_counter() - started) * 1000}
+        if trace:
+            row['peak_mib'] = tracemalloc.get_traced_memory()[1] / 2**20
+        problems = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        if problems:
+            raise RuntimeError(f"{label}: {problems[0]}")
+        rows.append(row)
+    return rows
+
+
+def _app_child(villages, storage_name, trace):
+    """Run run_app_session in a fresh process with its own data directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DASHBOARD_DATA_DIR=tmp, DASHBOARD_STORAGE=storage_name)
+        command = [sys.executable, os.path.abspath(__file__), '--app-session', str(villages)]
+        done = subprocess.run(command + (['--trace'] if trace else []), env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        raise RuntimeError(f"{villages:,} villages: {done.stderr.strip().splitlines()[-1]}")
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def bench_app(sizes, storage_name, output=None, baseline=None, tolerance=1.5):
+    """Per-interaction latency and peak memory of app.py at each size.
+
+    Latency and memory come from two separate sessions, as tracing
+    allocations slows everything down. Returns the names of interactions
+    slower than tolerance times their time in the baseline JSON file."""
+    results = {}
+    table = None
+    for villages in sizes:
+        timed_rows = _app_child(villages, storage_name, trace=False)
+        traced = _app_child(villages, storage_name, trace=True)
+        results[str(villages)] = {row['Interaction']: row['ms'] for row in timed_rows}
+        frame = pd.DataFrame({
+            f'{villages:,} ms': [round(row['ms']) for row in timed_rows],
+            f'{villages:,} peak MiB': [round(row['peak_mib'], 1) for row in traced],
+        }, index=[row['Interaction'] for row in timed_rows])
+        table = frame if table is None else table.join(frame)
+        print(f"{villages:,} villages, {villages * REMARKS_PER_VILLAGE:,} remarks ({storage_name}) done")
+    print(table.to_string())
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+    regressions = []
+    if baseline:
+        with open(baseline) as f:
+            before = json.load(f)
+        for size, timings in results.items():
+            for label, ms in timings.items():
+                reference = before.get(size, {}).get(label)
+                if reference and ms > reference * tolerance:
+                    regressions.append(f"{label} at {int(size):,} villages: {ms:.0f} ms, was {reference:.0f} ms")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+    return regressions
+
+
+async def _sticky_cookie(host, port):
+    """Cookies the cluster's proxy sets on the first page load"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET / HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    head = (await reader.read()).split(b'\r\n\r\n', 1)[0].decode('latin-1')
+    writer.close()
+    return '; '.join(line.split(':', 1)[1].split(';', 1)[0].strip()
+                     for line in head.split('\r\n') if line.lower().startswith('set-cookie:'))
+
+
+async def _rerun(ws):
+    """Rerun app.py in the websocket's session, as a browser does"""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ''
+    await ws.send(msg.SerializeToString())
+    while True:
+        reply = ForwardMsg()
+        reply.ParseFromString(await ws.recv())
+        if reply.WhichOneof('type') != 'script_finished':
+            continue
+        if reply.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+            raise RuntimeError("app.py failed to compile")
+        if reply.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+            return
+
+
+async def _load(host, port, users, duration):
+    """Open users sessions through the proxy, rerun each once to warm its
+    worker, then rerun them all back to back for duration seconds. Returns
+    the latency of every timed rerun."""
+    from websockets.asyncio.client import connect
+
+    sessions = []
+    try:
+        # One at a time, so each session is open before the proxy places the next
+        for _ in range(users):
+            cookie = await _sticky_cookie(host, port)
+            ws = await connect(f'ws://{host}:{port}/_stcore/stream', subprotocols=['streamlit'],
+                               additional_headers={'Cookie': cookie}, max_size=None)
+            sessions.append(ws)
+            await _rerun(ws)
+        latencies = []
+        deadline = time.perf_counter() + duration
+
+        async def user(ws):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await _rerun(ws)
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(user(ws) for ws in sessions))
+        return latencies
+    finally:
+        for ws in sessions:
+            await ws.close()
+
+
+def _run_cluster(workers, port, env, log_path):
+    """Start cluster.py and wait until all its workers answer"""
+    log = open(log_path, 'w')
+    command = [sys.executable, CLUSTER, '--workers', str(workers), '--port', str(port),
+               '--worker-port', str(port + 1)]
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    while True:
+        with open(log_path) as f:
+            if 'workers ready' in f.read():
+                return process
+        if process.poll() is not None:
+            with open(log_path) as f:
+                raise RuntimeError(f"cluster.py exited: {f.read().strip().splitlines()[-1:]}")
+        time.sleep(0.5)
+
+
+def bench_cluster(workers_counts, users, duration, villages, storage_name, port=8700):
+    """Reruns per second of app.py served by cluster.py with each number of
+    workers, users sessions rerunning back to back"""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DASHBOARD_DATA_DIR=tmp, DASHBOARD_STORAGE=storage_name)
+        synthetic_villages(villages).to_csv(os.path.join(tmp, 'villages_data.csv'), index=False)
+        synthetic_remarks(villages * REMARKS_PER_VILLAGE, villages=villages).to_csv(
+            os.path.join(tmp, 'remarks_data.csv'), index=False)
+        for workers in workers_counts:
+            process = _run_cluster(workers, port, env, os.path.join(tmp, 'cluster.log'))
+            try:
+                latencies = sorted(asyncio.run(_load('127.0.0.1', port, users, duration)))
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait()
+            rows.append({'Workers': workers, 'Reruns/s': len(latencies) / duration,
+                         'p50 ms': latencies[len(latencies) // 2] * 1000,
+                         'p90 ms': latencies[int(len(latencies) * 0.9)] * 1000})
+    table = pd.DataFrame(rows).set_index('Workers')
+    table['Speed-up'] = table['Reruns/s'] / table['Reruns/s'].iloc[0]
+    print(f"{villages:,} villages ({storage_name}), {users} sessions, {duration:g} s per run, "
+          f"{os.cpu_count()} CPUs")
+    print(table.round(2).to_string())
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--villages', type=int, help="default 100,000 (10,000 with --cluster)")
+    parser.add_argument('--remarks', type=int, default=300_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--app', action='store_true', help="drive app.py through a typical session instead")
+    parser.add_argument('--sizes', type=int, nargs='+', default=APP_SIZES, help="villages per --app run")
+    parser.add_argument('--storage', default='sqlite', choices=['sqlite', 'csv'])
+    parser.add_argument('--output', help="save --app latencies to this JSON file")
+    parser.add_argument('--baseline', help="fail if an --app latency exceeds the one saved here")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--cluster', action='store_true',
+                        help="load test app.py behind cluster.py with each --workers count instead")
+    parser.add_argument('--workers', type=int, nargs='+', default=CLUSTER_WORKERS)
+    parser.add_argument('--users', type=int, default=8, help="concurrent --cluster sessions")
+    parser.add_argument('--duration', type=float, default=20, help="seconds per --cluster run")
+    parser.add_argument('--app-session', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.app_session:
+        print(json.dumps(run_app_session(args.app_session, args.trace)))
+        return
+    if args.cluster:
+        bench_cluster(args.workers, args.users, args.duration, args.villages or CLUSTER_VILLAGES, args.storage)
+        return
+    if args.app:
+        regressions = bench_app(args.sizes, args.storage, args.output, args.baseline, args.tolerance)
+        sys.exit(1 if regressions else 0)
+    args.villages = args.villages or 100_000
+    bench_load(args.villages, args.repeat)
+    bench_cold_start(args.villages, args.repeat)
+    bench_remarks_search(args.remarks, args.repeat)
+    bench_phase_timeline(args.villages, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
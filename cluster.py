@@ -0,0 +1,284 @@
+"""Run several Streamlit workers behind one sticky-session proxy.
+
+    python cluster.py                       # one worker per CPU on port 8501
+    python cluster.py --workers 4 --port 8501 --address 0.0.0.0
+
+A single `streamlit run app.py` runs every session's script in a thread of
+one interpreter, so one GIL serves every user. This starts --workers copies
+of app.py on 127.0.0.1, ports --worker-port and up, and a small reverse
+proxy on --port in front of them. A session has to stay on the worker that
+holds it (its session state, widget values and download files live in that
+process), so the proxy pins each browser to one worker with the
+dashboard_worker cookie. A browser without the cookie gets the live worker
+with the fewest open connections. Each HTTP request is sent to the worker
+on its own connection, so a request is never carried to another browser's
+worker on a kept-alive connection. Websockets are piped through as they are.
+
+All workers share the data directory (DASHBOARD_DATA_DIR). Use the SQLite
+storage (the default): writes from several processes queue on the
+database's write lock. Nothing has to be sent between workers when the data
+changes. Every cached data set is keyed on a change token that is read from
+the shared store on each rerun: the database's version counter, and the size
+and modification time of the CSV files and the remarks log. A save made on
+one worker is therefore picked up by the others on their next rerun.
+
+Workers that exit are restarted; until a worker answers again its browsers
+are moved to another one. All workers share a cookie secret, so a moved
+browser keeps a valid XSRF cookie.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+from contextlib import suppress
+from http.cookies import SimpleCookie
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+COOKIE = 'dashboard_worker'
+WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 0)) or os.cpu_count() or 1
+HEALTH_INTERVAL = 2.0
+# A worker that keeps exiting is restarted at most this often
+RESTART_INTERVAL = 5.0
+STOP_TIMEOUT = 10.0
+BUFFER = 65536
+
+
+def worker_command(port):
+    return [sys.executable, '-m', 'streamlit', 'run', APP,
+            f'--server.port={port}', '--server.address=127.0.0.1',
+            '--server.headless=true', '--server.fileWatcherType=none']
+
+
+def _parse_head(head):
+    """(request or status line, [(name, value), ...]) of an HTTP head"""
+    lines = head.decode('latin-1').split('\r\n')
+    headers = []
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def _build_head(first_line, headers):
+    return ''.join([first_line + '\r\n'] + [f'{name}: {value}\r\n' for name, value in headers]
+                   + ['\r\n']).encode('latin-1')
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return ''
+
+
+def _cookie_worker(headers):
+    """Worker number from the dashboard_worker cookie, or None"""
+    cookies = SimpleCookie()
+    try:
+        cookies.load('; '.join(value for key, value in headers if key.lower() == 'cookie'))
+    except Exception:
+        return None
+    morsel = cookies.get(COOKIE)
+    return int(morsel.value) if morsel is not None and morsel.value.isdigit() else None
+
+
+async def _pipe(reader, writer):
+    """Copy reader to writer until either side closes"""
+    try:
+        while True:
+            data = await reader.read(BUFFER)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        with suppress(Exception):
+            if writer.can_write_eof():
+                writer.write_eof()
+
+
+async def _close(writer):
+    writer.close()
+    with suppress(Exception):
+        await writer.wait_closed()
+
+
+class Cluster:
+    """The worker processes and the proxy in front of them"""
+
+    def __init__(self, workers, worker_port):
+        self.ports = [worker_port + i for i in range(workers)]
+        self.processes = [None] * workers
+        self.started = [0.0] * workers
+        self.up = [False] * workers
+        self.connections = [0] * workers
+        self.assigned = [0] * workers
+        self.env = dict(os.environ)
+        # Every worker has to sign and accept the same XSRF cookies
+        self.env.setdefault('STREAMLIT_SERVER_COOKIE_SECRET', secrets.token_hex(32))
+
+    def start_worker(self, i):
+        self.processes[i] = subprocess.Popen(worker_command(self.ports[i]), env=self.env)
+        self.started[i] = time.monotonic()
+        self.up[i] = False
+
+    async def check_worker(self, i):
+        """Whether worker i answers its health check, or None when it is too
+        busy to answer in time"""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', self.ports[i]), HEALTH_INTERVAL)
+        except asyncio.TimeoutError:
+            return None
+        except OSError:
+            return False
+        try:
+            writer.write(b'GET /_stcore/health HTTP/1.0\r\nHost: 127.0.0.1\r\n\r\n')
+            status = await asyncio.wait_for(reader.readline(), HEALTH_INTERVAL)
+            return status.split(b' ')[1:2] == [b'200']
+        except asyncio.TimeoutError:
+            return None
+        except OSError:
+            return False
+        finally:
+            await _close(writer)
+
+    async def wait_until_up(self, i):
+        while not await self.check_worker(i):
+            if self.processes[i].poll() is not None:
+                raise RuntimeError(f"worker {i} exited with status {self.processes[i].returncode}")
+            await asyncio.sleep(0.5)
+        self.up[i] = True
+
+    async def supervise(self):
+        """Restart workers that exit and keep up[] current. A worker busy
+        running scripts keeps its browsers until it refuses connections."""
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            for i, process in enumerate(self.processes):
+                if process.poll() is not None:
+                    self.up[i] = False
+                    if time.monotonic() - self.started[i] >= RESTART_INTERVAL:
+                        print(f"worker {i} exited with status {process.returncode}, restarting", flush=True)
+                        self.start_worker(i)
+            checks = await asyncio.gather(*(self.check_worker(i) for i in range(len(self.ports))))
+            for i, healthy in enumerate(checks):
+                if healthy is not None:
+                    self.up[i] = healthy
+
+    def pick_worker(self, wanted):
+        """The cookie's worker if it is up, else the live one with the fewest
+        open connections (and, among those, the fewest browsers so far)"""
+        if wanted is not None and 0 <= wanted < len(self.up) and self.up[wanted]:
+            return wanted
+        live = [i for i, up in enumerate(self.up) if up]
+        if not live:
+            return None
+        worker = min(live, key=lambda i: (self.connections[i], self.assigned[i]))
+        self.assigned[worker] += 1
+        return worker
+
+    async def handle(self, client_reader, client_writer):
+        """Proxy one client connection to its worker"""
+        try:
+            head = await client_reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            await _close(client_writer)
+            return
+        request_line, headers = _parse_head(head)
+        wanted = _cookie_worker(headers)
+        worker = self.pick_worker(wanted)
+        if worker is None:
+            client_writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await _close(client_writer)
+            return
+
+        if _header(headers, 'upgrade').lower() != 'websocket':
+            # One request per connection, so the next one is routed by its own cookie
+            headers = [(k, v) for k, v in headers if k.lower() not in ('connection', 'keep-alive')]
+            headers.append(('Connection', 'close'))
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', self.ports[worker])
+        except OSError:
+            self.up[worker] = False
+            client_writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await _close(client_writer)
+            return
+
+        self.connections[worker] += 1
+        # The request body (an upload's PUT) is sent on while the response
+        # head is awaited, or the worker would wait for it forever
+        request = asyncio.ensure_future(_pipe(client_reader, upstream_writer))
+        try:
+            upstream_writer.write(_build_head(request_line, headers))
+            if wanted != worker:
+                response = await upstream_reader.readuntil(b'\r\n\r\n')
+                status_line, response_headers = _parse_head(response)
+                response_headers.append(('Set-Cookie', f'{COOKIE}={worker}; Path=/; HttpOnly; SameSite=Lax'))
+                client_writer.write(_build_head(status_line, response_headers))
+            await asyncio.gather(request, _pipe(upstream_reader, client_writer))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            request.cancel()
+            self.connections[worker] -= 1
+            await _close(upstream_writer)
+            await _close(client_writer)
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in self.processes:
+            if process is None:
+                continue
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    async def serve(self, address, port):
+        """Start the workers and proxy until SIGINT or SIGTERM"""
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        try:
+            for i in range(len(self.ports)):
+                self.start_worker(i)
+            await asyncio.gather(*(self.wait_until_up(i) for i in range(len(self.ports))))
+            server = await asyncio.start_server(self.handle, address, port, limit=BUFFER)
+            supervisor = asyncio.create_task(self.supervise())
+            print(f"{len(self.ports)} workers ready on http://{address}:{port}", flush=True)
+            async with server:
+                await stopping.wait()
+            supervisor.cancel()
+        finally:
+            self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help="Streamlit processes (default: DASHBOARD_WORKERS or the number of CPUs)")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8501)))
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--worker-port', type=int, default=8600, help="port of the first worker")
+    args = parser.parse_args()
+    try:
+        asyncio.run(Cluster(args.workers, args.worker_port).serve(args.address, args.port))
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""CSV and Excel exports, generated in the background and kept per data version.
+
+An export is only built when someone asks for it. It is written by a worker
+thread into EXPORT_DIR, CHUNK_ROWS rows at a time (Excel through openpyxl's
+write-only mode), so the export is never assembled in memory. The
+file is named after the version of the data it holds: later downloads of the
+same version reuse it, concurrent requests wait for the same build, and older
+versions are removed once a newer one is written and they have not been
+served for EXPORT_KEEP_SECONDS.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import stage
+from storage import DATA_DIR
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+EXPORT_DIR = os.path.join(DATA_DIR, ".exports")
+CHUNK_ROWS = 10000
+# Excel sheets hold 1,048,576 rows including the header; longer tables
+# continue on further sheets
+EXCEL_MAX_ROWS = 1048575
+# Other versions of an export (older data, other remark filters) may still be
+# downloading in another session or worker; they are kept this long after
+# their last use
+EXPORT_KEEP_SECONDS = 600
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def excel_available():
+    """Whether openpyxl is installed"""
+    return Workbook is not None
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def write_csv(f, df):
+    """Write df to the binary file f as UTF-8 CSV, a chunk at a time"""
+    if df.empty:
+        f.write(df.to_csv(index=False).encode('utf-8'))
+    for n, chunk in enumerate(_chunks(df)):
+        f.write(chunk.to_csv(index=False, header=n == 0).encode('utf-8'))
+
+
+def _rows(df):
+    """Rows of df as lists of Excel-friendly values (missing values empty)"""
+    for chunk in _chunks(df):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        yield from values.itertuples(index=False, name=None)
+
+
+def write_xlsx(f, sheets):
+    """Write the DataFrames of sheets (title -> df) to f as one workbook"""
+    if Workbook is None:
+        raise RuntimeError("Excel export requires openpyxl: pip install openpyxl")
+    workbook = Workbook(write_only=True)
+    for title, df in sheets.items():
+        sheet, part, count = None, 1, EXCEL_MAX_ROWS
+        rows = _rows(df)
+        while True:
+            if count == EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(title if part == 1 else f"{title} ({part})")
+                sheet.append([str(col) for col in df.columns])
+                part, count = part + 1, 0
+            row = next(rows, None)
+            if row is None:
+                break
+            sheet.append(list(row))
+            count += 1
+    workbook.save(f)
+
+
+def _export_path(name, key, suffix):
+    digest = hashlib.sha1(json.dumps(key, default=str).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(EXPORT_DIR, f"{name}-{digest}{suffix}")
+
+
+def _build(path, write, args):
+    """Write the export through a temp file, then drop older versions of it"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, stage(f"export:{os.path.basename(path).rsplit('-', 1)[0]}"):
+            write(f, *args)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    prefix = os.path.basename(path).rsplit('-', 1)[0] + '-'
+    cutoff = time.time() - EXPORT_KEEP_SECONDS
+    for other in os.listdir(EXPORT_DIR):
+        if other.startswith(prefix) and other != os.path.basename(path):
+            other_path = os.path.join(EXPORT_DIR, other)
+            try:
+                if os.path.getmtime(other_path) < cutoff:
+                    os.remove(other_path)
+            except OSError:
+                pass
+    return path
+
+
+def export_file(name, key, suffix, write, *args):
+    """Path of the export name for data version key, built with
+    write(file, *args) on a worker thread if it does not exist yet"""
+    path = _export_path(name, key, suffix)
+    try:
+        # Mark it as in use so other builds keep it
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    with _jobs_lock:
+        job = _jobs.get(path)
+        if job is None:
+            job = _jobs[path] = _executor.submit(_build, path, write, args)
+    try:
+        return job.result()
+    finally:
+        with _jobs_lock:
+            if _jobs.get(path) is job and job.done():
+                del _jobs[path]
+
+
+def read_export(name, key, suffix, write, *args):
+    """Contents of the export, for st.download_button"""
+    try:
+        with open(export_file(name, key, suffix, write, *args), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        # Removed by a build elsewhere between the lookup and the open
+        with open(export_file(name, key, suffix, write, *args), 'rb') as f:
+            return f.read()
+
+
+def villages_csv(key, villages_df):
+    """Villages data as CSV, as it is re-imported"""
+    return read_export('villages', key, '.csv', write_csv, villages_df)
+
+
+def remarks_csv(key, remarks_df):
+    """Remarks as CSV; key is the remarks version plus the filters that
+    selected remarks_df"""
+    return read_export('remarks', key, '.csv', write_csv, remarks_df)
+
+
+def dashboard_xlsx(key, sheets):
+    """One workbook with a sheet per DataFrame of sheets"""
+    return read_export('dashboard', key, '.xlsx', write_xlsx, sheets)
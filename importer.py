@@ -0,0 +1,218 @@
+"""Chunked validation and import of bulk village CSV uploads.
+
+The upload is read CHUNK_SIZE rows at a time; each chunk is validated,
+compared with the current villages and only the rows that differ are handed
+to the storage backend. Apart from the set of village names seen so far
+nothing grows with the size of the upload: error and diff samples are capped.
+"""
+import pandas as pd
+
+from storage import (
+    VILLAGE_COLUMNS, VILLAGE_DATE_COLUMNS, NUMERIC_COLUMNS, PHASE_ORDER,
+    STATUS_OPTIONS, ZONE_OPTIONS, VERSION_COLUMN, get_storage, parse_dates,
+)
+
+REQUIRED_COLUMNS = ['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status']
+ALLOWED_VALUES = {
+    'Current_Phase': PHASE_ORDER,
+    'Status': STATUS_OPTIONS,
+    'Municipal_Zone': ZONE_OPTIONS,
+}
+CHUNK_SIZE = 5000
+MAX_REPORTED = 200
+PREVIEW_ROWS = 5
+
+
+class UploadFormatError(ValueError):
+    """The upload cannot be imported at all (e.g. required columns missing)"""
+
+
+def read_chunks(source, chunk_size=CHUNK_SIZE):
+    """Yield the CSV in source as string DataFrames of at most chunk_size rows"""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        reader = pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    except pd.errors.EmptyDataError:
+        raise UploadFormatError("The uploaded file is empty")
+    with reader:
+        for chunk in reader:
+            chunk.columns = [str(col).strip() for col in chunk.columns]
+            missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing:
+                raise UploadFormatError(f"CSV must contain these columns: {', '.join(REQUIRED_COLUMNS)} "
+                                        f"(missing: {', '.join(missing)})")
+            yield chunk.drop(columns=[VERSION_COLUMN], errors='ignore')
+
+
+def _typed(chunk):
+    """Convert a string chunk to the dtypes the backends store"""
+    # Blank cells are missing values; other values are kept as typed
+    typed = chunk.replace(r'^\s*$', None, regex=True)
+    for col in typed.columns:
+        if col in VILLAGE_DATE_COLUMNS:
+            typed[col] = parse_dates(typed[col])
+        elif col in NUMERIC_COLUMNS:
+            typed[col] = pd.to_numeric(typed[col], errors='coerce')
+    return typed
+
+
+def validate_chunk(chunk, typed, first_line, seen):
+    """Return (row_errors, invalid_mask) for one chunk.
+
+    first_line is the CSV line number of the chunk's first row and seen the
+    village names of earlier chunks, used to reject duplicates.
+    """
+    lines = pd.RangeIndex(first_line, first_line + len(chunk))
+    names = typed['Village_Name']
+    problems = []
+    for col in REQUIRED_COLUMNS:
+        problems.append((typed[col].isna(), col, 'Required value is missing'))
+    for col, allowed in ALLOWED_VALUES.items():
+        values = typed[col]
+        problems.append((values.notna() & ~values.isin(allowed), col,
+                         f"Must be one of: {', '.join(allowed)}"))
+    for col in chunk.columns:
+        if col in VILLAGE_DATE_COLUMNS:
+            problems.append((chunk[col].str.strip().ne('') & typed[col].isna(), col, 'Not a valid date'))
+        elif col in NUMERIC_COLUMNS:
+            problems.append((chunk[col].str.strip().ne('') & typed[col].isna(), col, 'Not a number'))
+    duplicated = names.notna() & (names.duplicated() | names.isin(seen))
+    problems.append((duplicated, 'Village_Name', 'Duplicate village name in the upload'))
+
+    invalid = pd.Series(False, index=chunk.index)
+    errors = []
+    for mask, col, message in problems:
+        mask = mask.to_numpy()
+        if not mask.any():
+            continue
+        invalid |= mask
+        for pos in mask.nonzero()[0][:MAX_REPORTED]:
+            errors.append({'Line': lines[pos], 'Village_Name': names.iloc[pos],
+                           'Column': col, 'Error': message})
+    errors.sort(key=lambda error: error['Line'])
+    return errors, invalid
+
+
+def _changed(typed, current):
+    """Return a boolean Series: rows of typed that are new or differ from current"""
+    old = current.reindex(typed['Village_Name'].to_numpy())
+    changed = pd.Series(~typed['Village_Name'].isin(current.index).to_numpy(), index=typed.index)
+    for col in typed.columns:
+        new_values = typed[col]
+        if col not in old.columns:
+            changed |= new_values.notna()
+            continue
+        old_values = pd.Series(old[col].to_numpy(), index=typed.index)
+        if col in VILLAGE_DATE_COLUMNS:
+            old_values = pd.to_datetime(old_values, errors='coerce')
+        elif col in NUMERIC_COLUMNS:
+            old_values = pd.to_numeric(old_values, errors='coerce')
+        else:
+            new_values = new_values.astype(object)
+            old_values = old_values.astype(object)
+        same = (new_values == old_values).fillna(False) | (new_values.isna() & old_values.isna())
+        changed |= ~same.astype(bool)
+    return changed
+
+
+def _diff_samples(rows, current, limit):
+    """Column-level old -> new samples for updated rows"""
+    samples = []
+    for name, row in rows.iterrows():
+        old = current.loc[name]
+        for col, value in row.items():
+            old_value = old.get(col)
+            if pd.isna(value) and pd.isna(old_value):
+                continue
+            if not pd.isna(value) and not pd.isna(old_value) and value == old_value:
+                continue
+            samples.append({'Village_Name': name, 'Column': col,
+                            'Current': '' if pd.isna(old_value) else str(old_value),
+                            'Uploaded': '' if pd.isna(value) else str(value)})
+            if len(samples) >= limit:
+                return samples
+    return samples
+
+
+def _process(source, current, replace, skip_invalid, report):
+    """Validate and diff the upload chunk by chunk, filling report; yields
+    (rows_to_write, names_in_chunk) for the backend's import_villages"""
+    seen = set()
+    first_line = 2  # line 1 is the header
+    for chunk in read_chunks(source):
+        typed = _typed(chunk)
+        if replace:
+            # A replaced village becomes exactly the uploaded row
+            for col in VILLAGE_COLUMNS:
+                if col not in typed.columns:
+                    typed[col] = pd.NaT if col in VILLAGE_DATE_COLUMNS else None
+        errors, invalid = validate_chunk(chunk, typed, first_line, seen)
+        names = typed['Village_Name'].dropna()
+        seen.update(names)
+        first_line += len(chunk)
+
+        report['rows'] += len(chunk)
+        report['invalid_rows'] += int(invalid.sum())
+        report['errors'].extend(errors[:MAX_REPORTED - len(report['errors'])])
+        if report['preview'] is None:
+            report['preview'] = chunk.head(PREVIEW_ROWS)
+            report['columns'] = list(chunk.columns)
+
+        valid = typed[~invalid] if skip_invalid else typed
+        changed = _changed(valid, current)
+        rows = valid[changed].set_index(valid.loc[changed, 'Village_Name'].to_numpy())
+        is_new = ~rows.index.isin(current.index)
+        report['inserts'] += int(is_new.sum())
+        report['updates'] += int((~is_new).sum())
+        report['unchanged'] += len(valid) - len(rows)
+        room = MAX_REPORTED - len(report['new_villages'])
+        report['new_villages'].extend(rows.index[is_new][:max(room, 0)].tolist())
+        room = MAX_REPORTED - len(report['changes'])
+        if room > 0:
+            report['changes'].extend(_diff_samples(rows[~is_new], current, room))
+        yield rows, names.tolist()
+
+    if report['rows'] == 0:
+        # Raised inside the backend's transaction, so nothing is written
+        raise UploadFormatError("The uploaded file contains no rows")
+    if replace:
+        removed = current.index[~current.index.isin(list(seen))]
+        report['deletes'] = len(removed)
+        report['removed_villages'] = removed[:MAX_REPORTED].tolist()
+
+
+def _new_report(replace):
+    return {'mode': 'replace' if replace else 'merge', 'rows': 0, 'invalid_rows': 0,
+            'errors': [], 'inserts': 0, 'updates': 0, 'unchanged': 0, 'deletes': 0,
+            'new_villages': [], 'changes': [], 'removed_villages': [],
+            'preview': None, 'columns': []}
+
+
+def scan_upload(source, current, replace=False):
+    """Validate the upload and diff it against current without writing.
+
+    Returns a report dict with row counts, the first MAX_REPORTED row errors,
+    the insert/update/unchanged/delete counts and samples of each.
+    """
+    report = _new_report(replace)
+    for _ in _process(source, current, replace, True, report):
+        pass
+    return report
+
+
+def import_upload(source, current, replace=False, skip_invalid=True):
+    """Write the upload through the storage backend in one pass.
+
+    In merge mode only new and changed rows are written; replace mode also
+    removes villages missing from the upload. Rows with errors are skipped
+    when skip_invalid is set, otherwise any error aborts before writing.
+    Returns the report of what was applied.
+    """
+    if not skip_invalid:
+        checked = scan_upload(source, current, replace)
+        if checked['invalid_rows']:
+            raise UploadFormatError(f"{checked['invalid_rows']} row(s) have errors")
+    report = _new_report(replace)
+    get_storage().import_villages(_process(source, current, replace, skip_invalid, report), replace=replace)
+    return report
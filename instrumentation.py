@@ -0,0 +1,196 @@
+"""Process-wide counters and timings for the dashboard's caches and stages.
+
+app.py is re-executed on every Streamlit rerun, so anything that has to
+outlive a rerun (and be shared by all sessions) lives in this module.
+
+Cache counters and figure build times are always recorded. Stage timings
+(loaders, aggregates, table renders, saves, whole reruns) are recorded only
+when profiling is switched on with DASHBOARD_PROFILE=1; otherwise timed()
+returns the function unchanged and stage() a shared no-op context, so the
+instrumented code runs as if it were not instrumented.
+"""
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+PROFILING = os.environ.get('DASHBOARD_PROFILE', '').lower() in ('1', 'true', 'yes')
+# Where write_profile() puts profile-<pid>.json and metrics-<pid>.prom
+PROFILE_DIR = os.environ.get('DASHBOARD_PROFILE_DIR',
+                             os.path.join(os.environ.get('DASHBOARD_DATA_DIR', ''), '.profile'))
+# Percentiles are taken over the latest SAMPLES runs of each step
+SAMPLES = 1000
+PERCENTILES = [50, 90, 99]
+
+_lock = threading.Lock()
+_cache_calls = {}
+_cache_misses = {}
+_timings = {}
+_samples = {}
+_last_write = [0.0]
+_NO_STAGE = nullcontext()
+
+
+def record_cache_call(name):
+    """Count a lookup of the cache called name"""
+    with _lock:
+        _cache_calls[name] = _cache_calls.get(name, 0) + 1
+
+
+def record_cache_miss(name):
+    """Count a lookup of the cache called name that had to recompute"""
+    with _lock:
+        _cache_misses[name] = _cache_misses.get(name, 0) + 1
+
+
+def cache_stats():
+    """Return {name: {'hits': ..., 'misses': ...}} for every cache seen so far"""
+    with _lock:
+        return {
+            name: {'hits': calls - _cache_misses.get(name, 0), 'misses': _cache_misses.get(name, 0)}
+            for name, calls in sorted(_cache_calls.items())
+        }
+
+
+def record_timing(name, seconds):
+    """Record how long one run of the step called name took"""
+    with _lock:
+        count, total, last = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = (count + 1, total + seconds, seconds)
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=SAMPLES)
+        samples.append(seconds)
+
+
+def _percentile(ordered, p):
+    """Nearest-rank percentile p of the sorted list ordered"""
+    rank = max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))
+    return ordered[rank]
+
+
+def timing_stats():
+    """Return {name: {'count', 'mean_ms', 'last_ms', 'p50_ms', 'p90_ms',
+    'p99_ms', 'max_ms'}}; percentiles cover the latest SAMPLES runs"""
+    with _lock:
+        timings = dict(_timings)
+        samples = {name: sorted(values) for name, values in _samples.items()}
+    stats = {}
+    for name, (count, total, last) in sorted(timings.items()):
+        ordered = samples[name]
+        row = {'count': count, 'mean_ms': total / count * 1000, 'last_ms': last * 1000}
+        for p in PERCENTILES:
+            row[f'p{p}_ms'] = _percentile(ordered, p) * 1000
+        row['max_ms'] = ordered[-1] * 1000
+        stats[name] = row
+    return stats
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+def stage(name):
+    """Context manager timing the block as step name while profiling"""
+    return _timed_stage(name) if PROFILING else _NO_STAGE
+
+
+def timed(name=None):
+    """Decorator timing every call as step name (default: the function's
+    name) while profiling; without profiling the function is returned as is"""
+    def decorate(func):
+        if not PROFILING:
+            return func
+        step = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(step, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def profile_json():
+    """Cache counters and timings as a JSON document"""
+    return json.dumps({'generated': time.time(), 'caches': cache_stats(), 'timings': timing_stats()},
+                      indent=2, sort_keys=True)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def profile_prometheus():
+    """Cache counters and timings in the Prometheus text exposition format"""
+    lines = ['# HELP dashboard_cache_hits_total Cache lookups served from the cache',
+             '# TYPE dashboard_cache_hits_total counter']
+    caches = cache_stats()
+    for name, row in caches.items():
+        lines.append(f'dashboard_cache_hits_total{{cache="{_label(name)}"}} {row["hits"]}')
+    lines += ['# HELP dashboard_cache_misses_total Cache lookups that recomputed',
+              '# TYPE dashboard_cache_misses_total counter']
+    for name, row in caches.items():
+        lines.append(f'dashboard_cache_misses_total{{cache="{_label(name)}"}} {row["misses"]}')
+    lines += ['# HELP dashboard_step_seconds Time spent in each step, over its latest runs',
+              '# TYPE dashboard_step_seconds summary']
+    for name, row in timing_stats().items():
+        step = _label(name)
+        for p in PERCENTILES:
+            lines.append(f'dashboard_step_seconds{{step="{step}",quantile="{p / 100}"}} {row[f"p{p}_ms"] / 1000:.6f}')
+        lines.append(f'dashboard_step_seconds_sum{{step="{step}"}} {row["mean_ms"] * row["count"] / 1000:.6f}')
+        lines.append(f'dashboard_step_seconds_count{{step="{step}"}} {row["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_profile(min_interval=10.0):
+    """Write this process's profile-<pid>.json and metrics-<pid>.prom to
+    PROFILE_DIR, at most once every min_interval seconds. Does nothing
+    unless profiling."""
+    if not PROFILING:
+        return False
+    now = time.monotonic()
+    with _lock:
+        if now - _last_write[0] < min_interval:
+            return False
+        _last_write[0] = now
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        suffix = f'-{os.getpid()}'
+        _write_atomic(os.path.join(PROFILE_DIR, f'profile{suffix}.json'), profile_json())
+        _write_atomic(os.path.join(PROFILE_DIR, f'metrics{suffix}.prom'), profile_prometheus())
+    except OSError:
+        return False
+    return True
+
+
+def reset_cache_stats():
+    with _lock:
+        _cache_calls.clear()
+        _cache_misses.clear()
+        _timings.clear()
+        _samples.clear()
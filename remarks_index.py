@@ -0,0 +1,166 @@
+"""Search index over the remarks data.
+
+One RemarksIndex is built per version of the remarks and shared by every
+session (see remarks_index_snapshot). It holds:
+
+- for each filter field, the row positions of every value (postings),
+- an inverted index from the words of Remarks/Response to row positions,
+  with a sorted vocabulary so a query word matches every word it prefixes,
+- the rows ordered by Date, so a date range is two binary searches.
+
+A query intersects the posting lists of its constraints, smallest first, so
+its cost depends on the size of the matches rather than on the number of
+remarks.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from analytics import VersionedSnapshot
+
+try:
+    # Installed with streamlit; splits millions of words in native code
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+FILTER_FIELDS = ['Department', 'Status', 'Help_Required', 'Village', 'Phase']
+TEXT_FIELDS = ['Remarks', 'Response']
+# A word is a run of letters (with their combining marks, as in Gurmukhi and
+# Devanagari), digits and underscores
+WORD_SEPARATOR = r'[^\p{L}\p{M}\p{N}_]+'
+WORD = re.compile(r'\w+')
+
+
+def _words(texts):
+    """(codes, vocabulary, rows) for every lower-cased word of the Series
+    texts: the word is vocabulary[code], from the text at position row.
+    Queries go through the same function so they split the same way."""
+    if pa is None:
+        words = texts.reset_index(drop=True).str.lower().str.findall(WORD).explode().dropna()
+        codes, vocabulary = pd.factorize(words.to_numpy(dtype=object))
+        return codes, np.asarray(vocabulary, dtype=object), words.index.to_numpy()
+    parts = pc.split_pattern_regex(pc.utf8_lower(pa.array(texts.tolist(), type=pa.string())), WORD_SEPARATOR)
+    words = pc.list_flatten(parts)
+    rows = pc.list_parent_indices(parts)
+    keep = pc.not_equal(words, '')
+    encoded = pc.dictionary_encode(pc.filter(words, keep))
+    return (encoded.indices.to_numpy(zero_copy_only=False),
+            encoded.dictionary.to_numpy(zero_copy_only=False).astype(object),
+            pc.filter(rows, keep).to_numpy(zero_copy_only=False))
+
+
+def query_words(text):
+    """The words of a search query, split like the indexed text"""
+    codes, vocabulary, _ = _words(pd.Series([text]))
+    return vocabulary[codes].tolist()
+
+
+def _postings(keys):
+    """(sorted unique keys, starts, positions): the rows holding keys[k] are
+    positions[starts[k]:starts[k + 1]], in ascending order"""
+    codes, uniques = pd.factorize(keys, sort=True)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    return np.asarray(uniques), starts, order
+
+
+class RemarksIndex:
+    """Lookup structures over one remarks frame"""
+
+    def __init__(self, df):
+        self.df = df
+        self._fields = {}
+        for field in FILTER_FIELDS:
+            if field in df.columns:
+                values = df[field].astype(object).where(df[field].notna(), '').astype(str)
+                self._fields[field] = _postings(values.to_numpy())
+
+        # Inverted index: the rows of the k-th word (in sorted order) are
+        # word_rows[word_starts[k]:word_starts[k + 1]]
+        texts = [df[col].fillna('').astype(str) for col in TEXT_FIELDS if col in df.columns]
+        if texts and len(df):
+            text = texts[0].str.cat(texts[1:], sep=' ') if len(texts) > 1 else texts[0]
+            codes, vocabulary, rows = _words(text)
+            order = np.argsort(vocabulary)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            # One key per distinct (word, row) pair, sorted by word then row
+            keys = np.sort(rank[codes].astype(np.int64) * len(df) + rows)
+            keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+            self._vocabulary = vocabulary[order]
+            self._word_rows = keys % len(df)
+            self._word_starts = np.searchsorted(keys // len(df), np.arange(len(order) + 1))
+        else:
+            self._vocabulary = np.array([], dtype=object)
+            self._word_rows = np.array([], dtype=np.int64)
+            self._word_starts = np.array([0])
+
+        if 'Date' in df.columns:
+            dates = df['Date'].to_numpy()
+            valid = np.flatnonzero(~pd.isna(dates))
+            order = valid[np.argsort(dates[valid], kind='stable')]
+            self._date_order = order
+            self._sorted_dates = dates[order]
+        else:
+            self._date_order = self._sorted_dates = None
+
+    def options(self, field):
+        """Distinct non-empty values of a filter field, sorted"""
+        if field not in self._fields:
+            return []
+        return [value for value in self._fields[field][0].tolist() if value != '']
+
+    def _field_rows(self, field, value):
+        if field not in self._fields:
+            return np.array([], dtype=np.int64)
+        keys, starts, positions = self._fields[field]
+        k = np.searchsorted(keys, value)
+        if k >= len(keys) or keys[k] != value:
+            return np.array([], dtype=np.int64)
+        return positions[starts[k]:starts[k + 1]]
+
+    def _prefix_rows(self, prefix):
+        """Rows containing a word that starts with prefix"""
+        lo = np.searchsorted(self._vocabulary, prefix, side='left')
+        hi = np.searchsorted(self._vocabulary, prefix + '\uffff', side='left')
+        rows = self._word_rows[self._word_starts[lo]:self._word_starts[hi]]
+        return rows if hi - lo == 1 else np.unique(rows)
+
+    def _date_rows(self, date_from, date_to):
+        """Rows dated from the start of date_from to the end of date_to"""
+        lo, hi = 0, len(self._sorted_dates)
+        if date_from is not None:
+            lo = np.searchsorted(self._sorted_dates, np.datetime64(pd.Timestamp(date_from).normalize()), side='left')
+        if date_to is not None:
+            end = pd.Timestamp(date_to).normalize() + pd.Timedelta(days=1)
+            hi = np.searchsorted(self._sorted_dates, np.datetime64(end), side='left')
+        return np.sort(self._date_order[lo:hi])
+
+    def search(self, filters=None, text='', date_from=None, date_to=None):
+        """Rows matching every constraint: filters maps fields to one value
+        each, every word of text must prefix a word of Remarks/Response and
+        Date must fall on or between the days date_from and date_to"""
+        candidates = []
+        for field, value in (filters or {}).items():
+            candidates.append(self._field_rows(field, value))
+        for word in query_words(text) if text.strip() else []:
+            candidates.append(self._prefix_rows(word))
+        if (date_from is not None or date_to is not None) and self._date_order is not None:
+            candidates.append(self._date_rows(date_from, date_to))
+        if not candidates:
+            return self.df
+        candidates.sort(key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return self.df.iloc[rows]
+
+
+remarks_index_snapshot = VersionedSnapshot('remarks_index', RemarksIndex)
@@ -0,0 +1,1046 @@
+"""Storage layer for the Urban Svamitva dashboard.
+
+Village data lives behind a storage backend chosen with the
+``DASHBOARD_STORAGE`` environment variable:
+
+- ``sqlite`` (default): ``dashboard.db`` in WAL mode with one row per
+  village keyed on Village_Name, so a single village edit is one indexed
+  UPSERT instead of a rewrite of the whole file.
+- ``csv``: ``villages_data.csv`` is read and rewritten in full.
+
+The CSV files stay the import/export format. The first time the SQLite
+backend is opened it imports the existing ``villages_data.csv`` once.
+
+Remarks are append-only: each submission and each response is one JSON
+line appended (and fsync'd) to ``remarks_log.jsonl``. Loading replays the
+log on top of ``remarks_data.csv``, and the log is folded back into the CSV
+once it grows past REMARKS_LOG_COMPACT_BYTES.
+
+Loaded frames are also kept as Arrow IPC snapshots in ``.snapshots/``,
+tagged with the version of the source they were read from. A new process
+memory-maps the snapshot instead of parsing the source; a snapshot whose
+version no longer matches is ignored and rewritten by the next load.
+
+This module does not import streamlit so it can be shared by scripts that
+run outside the dashboard.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory file locks, fall back to in-process locking
+    fcntl = None
+
+try:
+    # Installed with streamlit. Its multi-threaded CSV reader is several times
+    # faster than pandas' C parser, and its IPC file format backs the snapshots
+    import pyarrow as pa
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    pa = None
+    CSV_ENGINE = 'c'
+
+# File paths; DASHBOARD_DATA_DIR lets several workers share one data directory
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', '')
+VILLAGES_DATA = os.path.join(DATA_DIR, "villages_data.csv")
+PROGRESS_DATA = os.path.join(DATA_DIR, "progress_data.csv")
+RESPONSIBILITY_DATA = os.path.join(DATA_DIR, "responsibility_data.csv")
+REMARKS_DATA = os.path.join(DATA_DIR, "remarks_data.csv")
+DATABASE = os.path.join(DATA_DIR, "dashboard.db")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, ".snapshots")
+REMARKS_LOG = os.path.join(DATA_DIR, "remarks_log.jsonl")
+TRANSITIONS_LOG = os.path.join(DATA_DIR, "transitions_log.jsonl")
+
+# Villages schema
+VILLAGE_DATE_COLUMNS = ['Last_Updated', 'Survey_Date', 'Notification_Date', 'Drone_Survey_Date',
+                        'Map1_Date', 'Ground_Truthing_Date', 'Map2_Date', 'Pasting_Start_Date',
+                        'Objections_Date', 'Map3_Date', 'Cards_Issued_Date']
+VILLAGE_COLUMNS = ['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status', 'Last_Updated',
+                   'HDM_JDM', 'ATP_MTP', 'ARRO_Officer', 'Total_Properties', 'Survey_Date',
+                   'Notification_Date', 'Drone_Survey_Date', 'Map1_Date', 'Ground_Truthing_Date',
+                   'Map2_Date', 'Pasting_Start_Date', 'Objections_Date', 'Map3_Date',
+                   'Cards_Issued_Date']
+NUMERIC_COLUMNS = ['Total_Properties']
+PHASE_ORDER = ['Notification', 'Drone Survey Pending', 'Map 1 awaited', 'Ground Truthing Pending', 'Map 2 awaited',
+               'Pasting', 'Objections Hearing', 'Map 3', 'Card Issuance']
+# The dates a village enters and leaves each phase; Card Issuance is the last
+# phase and has no end date
+PHASE_DATE_COLUMNS = {
+    'Notification': ('Notification_Date', 'Notification_Date'),
+    'Drone Survey Pending': ('Notification_Date', 'Drone_Survey_Date'),
+    'Map 1 awaited': ('Drone_Survey_Date', 'Map1_Date'),
+    'Ground Truthing Pending': ('Map1_Date', 'Ground_Truthing_Date'),
+    'Map 2 awaited': ('Ground_Truthing_Date', 'Map2_Date'),
+    'Pasting': ('Pasting_Start_Date', 'Objections_Date'),
+    'Objections Hearing': ('Objections_Date', 'Map3_Date'),
+    'Map 3': ('Map3_Date', 'Cards_Issued_Date'),
+    'Card Issuance': ('Cards_Issued_Date', None),
+}
+STATUS_OPTIONS = ['Completed', 'On Track', 'Behind Schedule']
+ZONE_OPTIONS = ['A', 'B', 'C', 'D']
+# Bumped on every write of a village row, used to detect stale edits
+VERSION_COLUMN = 'Row_Version'
+# Low-cardinality text columns are held as categoricals. Columns with a fixed
+# vocabulary get it as their leading categories (phases in workflow order);
+# values outside it are kept as extra categories rather than dropped.
+CATEGORY_COLUMNS = {
+    'Municipal_Zone': ZONE_OPTIONS,
+    'Current_Phase': PHASE_ORDER,
+    'Status': STATUS_OPTIONS,
+    'HDM_JDM': [],
+    'ATP_MTP': [],
+    'ARRO_Officer': [],
+}
+# dtypes handed to read_csv so text columns are never inferred
+VILLAGE_CSV_DTYPES = dict({'Village_Name': str}, **{col: 'category' for col in CATEGORY_COLUMNS})
+
+# Remarks schema
+REMARKS_COLUMNS = ['Remark_ID', 'Date', 'Official_Name', 'Department', 'Phase', 'Village',
+                   'Remarks', 'Help_Required', 'Status', 'Response']
+# Fold the remarks log back into remarks_data.csv past this size
+REMARKS_LOG_COMPACT_BYTES = 256 * 1024
+# A village's place in the Overview counters; a change to any of these is a
+# transition and is recorded in the transition log
+TRANSITION_COLUMNS = ['Municipal_Zone', 'Current_Phase', 'Status']
+
+
+def parse_dates(values):
+    """Parse a column of dates: each distinct value is parsed once, canonical
+    ISO 8601 strings in one vectorized pass and only the values that fail it
+    with the slow per-element mixed-format parser"""
+    if values.dtype.kind == 'M':
+        return values
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(uniques, errors='coerce', format='ISO8601')
+    failed = parsed.isna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(uniques[failed], errors='coerce', format='mixed')
+    # Missing values have code -1, which picks the trailing NaT
+    dates = np.append(parsed.to_numpy(), np.datetime64('NaT'))
+    return pd.Series(dates[codes], index=values.index, name=values.name)
+
+
+def as_category(values, vocabulary=()):
+    """values as a categorical whose categories are vocabulary followed by
+    any other values present"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        present = values.cat.categories
+    else:
+        present = pd.Index(values.dropna().unique())
+    known = set(vocabulary)
+    extra = sorted((v for v in present if v not in known), key=str)
+    categories = list(vocabulary) + extra
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.set_categories(categories)
+    return pd.Series(pd.Categorical(values, categories=categories), index=values.index, name=values.name)
+
+
+def read_villages_csv(source):
+    """Read a villages CSV with the declared text dtypes; dates are left to
+    apply_village_schema"""
+    return pd.read_csv(source, dtype=VILLAGE_CSV_DTYPES, engine=CSV_ENGINE)
+
+
+def apply_village_schema(df):
+    """Convert the columns of df to the declared village dtypes in place"""
+    for col in VILLAGE_DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col, vocabulary in CATEGORY_COLUMNS.items():
+        if col in df.columns:
+            df[col] = as_category(df[col], vocabulary)
+    return df
+
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Advisory lock on path (via path + '.lock') held across threads and processes"""
+    lock_path = path + '.lock'
+    if fcntl is None:
+        with _local_locks_guard:
+            lock = _local_locks.setdefault(lock_path, threading.Lock())
+        with lock:
+            yield
+        return
+    # Every call opens its own file description, so flock also excludes
+    # other threads of this process
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_csv(df, path):
+    """Write df to path through a temp file in the same directory and os.replace,
+    so readers see either the old or the new file, never a partial one"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_file = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+
+def file_signature(path):
+    """Cheap change token for a file: (inode, mtime_ns, size), or None if missing.
+
+    Writes go through os.replace, which gives the file a new inode, so the
+    token changes even when two writes land within the same mtime tick.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, name + '.arrow')
+
+
+def read_snapshot(name, key):
+    """The frame last written by write_snapshot(name, df, key) with the same
+    key, or None if there is none or it was taken from another version.
+    df.attrs['version'] is not restored; it is the caller's key."""
+    if pa is None or key is None:
+        return None
+    try:
+        # The frame's buffers keep the mapping alive after this returns
+        table = pa.ipc.open_file(pa.memory_map(_snapshot_path(name))).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'dashboard_key') != json.dumps(key).encode():
+        return None
+    df = table.to_pandas()
+    df.attrs = json.loads(metadata.get(b'dashboard_attrs', b'{}'))
+    return df
+
+
+def write_snapshot(name, df, key):
+    """Save df as the snapshot of version key of its source. Snapshots are
+    only a cache, so failing to write one is not an error."""
+    if pa is None or key is None:
+        return
+    path = _snapshot_path(name)
+    tmp_path = None
+    try:
+        attrs = {k: v for k, v in df.attrs.items() if k != 'version'}
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {},
+                                                   dashboard_key=json.dumps(key),
+                                                   dashboard_attrs=json.dumps(attrs)))
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.tmp')
+        os.close(fd)
+        # Uncompressed, so readers can memory-map it
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError, pa.ArrowException):
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_csv(path):
+    """pd.read_csv(path), served from a snapshot while the file is unchanged"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    key = file_signature(path)
+    df = read_snapshot(name, key)
+    if df is None:
+        df = pd.read_csv(path)
+        write_snapshot(name, df, key)
+    return df
+
+
+def load_responsibility(path=RESPONSIBILITY_DATA):
+    """responsibility_data.csv without empty rows or rows without a Phase"""
+    df = load_csv(path).dropna(how='all')
+    if 'Phase' in df.columns:
+        df = df[df['Phase'].notna()]
+        df = df[df['Phase'].astype(str).str.strip() != '']
+    return df
+
+
+def remarks_signature(csv_path=REMARKS_DATA, log_path=REMARKS_LOG):
+    """Change token for the remarks data (CSV plus append-only log)"""
+    return (file_signature(csv_path), file_signature(log_path))
+
+
+def index_villages(df):
+    """Index df by Village_Name (the column is kept) so single villages are
+    looked up with df.loc[name].
+
+    Names must be unique: for a duplicated name only its last row is kept,
+    and rows without a name are dropped. What was dropped is listed in
+    df.attrs['duplicate_villages'] and df.attrs['unnamed_villages'].
+    """
+    attrs = dict(df.attrs)
+    if 'Village_Name' not in df.columns:
+        return df
+    unnamed = df['Village_Name'].isna()
+    duplicated = df['Village_Name'].duplicated(keep='last') & ~unnamed
+    duplicates = sorted(df.loc[duplicated, 'Village_Name'].unique().tolist())
+    if unnamed.any() or duplicated.any():
+        df = df[~(unnamed | duplicated)]
+    df = df.set_axis(pd.Index(df['Village_Name'].to_numpy(), name=None), axis=0)
+    df.attrs.update(attrs)
+    df.attrs['duplicate_villages'] = duplicates
+    df.attrs['unnamed_villages'] = int(unnamed.sum())
+    return df
+
+
+def _make_room(df, col, values):
+    """Widen column col of df in place so that values can be assigned to it"""
+    column = df[col]
+    values = pd.Series(list(values), dtype=object).dropna()
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        missing = values[~values.isin(column.cat.categories)].unique()
+        if len(missing):
+            df[col] = column.cat.add_categories(missing)
+    elif column.dtype.kind in 'biufM' and values.map(lambda v: isinstance(v, str)).any():
+        # e.g. an all-empty text column that was read as float
+        df[col] = column.astype(object)
+
+
+def _assign_row(df, name, fields):
+    """Set fields on the village row name of an indexed frame in one
+    assignment, adding the row if it does not exist"""
+    for col, value in fields.items():
+        if col not in df.columns:
+            df[col] = None
+        else:
+            _make_room(df, col, [value])
+    if name in df.index:
+        cols = list(fields.keys())
+        df.loc[name, cols] = [fields[c] for c in cols]
+        return df
+    return pd.concat([df, pd.DataFrame([fields], index=[name])])
+
+
+def _quote(name):
+    """Quote a column name for use in SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _column_type(col, new=False):
+    """SQLite column definition for a villages column"""
+    if col == 'Village_Name':
+        return 'TEXT NOT NULL PRIMARY KEY'
+    if col == VERSION_COLUMN:
+        return 'INTEGER NOT NULL DEFAULT 0'
+    if col in NUMERIC_COLUMNS:
+        return 'REAL'
+    if new and col not in VILLAGE_COLUMNS:
+        # Extra uploaded columns keep whatever type they arrive with
+        return ''
+    return 'TEXT'
+
+
+def _to_sql_value(value):
+    """Convert a pandas value to something sqlite3 can store"""
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(value, 'item'):
+        # numpy scalar
+        return value.item()
+    return value
+
+
+class StaleWriteError(Exception):
+    """A village was changed by someone else since it was read"""
+
+    def __init__(self, village_name, conflicts, current):
+        self.village_name = village_name
+        self.conflicts = conflicts
+        self.current = current
+        if current is None:
+            message = f"Village '{village_name}' no longer exists"
+        elif conflicts:
+            message = f"Village '{village_name}' was changed by someone else ({', '.join(conflicts)})"
+        else:
+            message = f"Village '{village_name}' already exists"
+        super().__init__(message)
+
+
+def _normalize(value):
+    """Normalize a value for comparing stored and edited village fields"""
+    value = _to_sql_value(value)
+    if value is None or value == '':
+        return None
+    return str(value)
+
+
+def merge_village_update(current, row, expected_version=None, base=None):
+    """Work out which fields of row to write over the stored village current.
+
+    current is the stored row (a dict, or None if the village does not exist),
+    expected_version the Row_Version the editor read, and base the values of
+    the edited fields as the editor read them. When the stored row changed
+    since it was read, fields the editor left untouched keep their stored
+    value and edits are merged in unless someone else changed the same field
+    to something different, in which case StaleWriteError is raised. Fields
+    missing from base (such as Last_Updated) are always written.
+
+    Returns (fields, merged).
+    """
+    current_version = int(current.get(VERSION_COLUMN) or 0) if current is not None else 0
+    if expected_version is not None and int(expected_version) == 0 and current is not None:
+        # Adding a village under a name that is already taken
+        raise StaleWriteError(row['Village_Name'], [], current)
+    if expected_version is None or current_version == int(expected_version):
+        return dict(row), False
+    if current is None or base is None:
+        raise StaleWriteError(row['Village_Name'], [], current)
+
+    fields = {}
+    conflicts = []
+    for col, value in row.items():
+        if col == 'Village_Name' or col not in base:
+            fields[col] = value
+            continue
+        if _normalize(value) == _normalize(base[col]):
+            # Not edited here, keep whatever is stored now
+            continue
+        changed_elsewhere = _normalize(current.get(col)) != _normalize(base[col])
+        if changed_elsewhere and _normalize(current.get(col)) != _normalize(value):
+            conflicts.append(col)
+        else:
+            fields[col] = value
+    if conflicts:
+        raise StaleWriteError(row['Village_Name'], conflicts, current)
+    return fields, True
+
+
+# Transition log: every write that adds or removes a village or changes its
+# zone, phase or status appends one JSON line per such village, with the
+# village's [zone, phase, status] before and after (null for an added or
+# removed village). The first write after the log is created records a
+# baseline instead: the number of villages per [zone, phase, status] after
+# that write. Records are appended while the backend still holds its write
+# lock, so the log follows the same order as the writes.
+
+def transition_keys(df):
+    """{Village_Name: [zone, phase, status]} of the villages in df, which is
+    indexed by Village_Name or has it as a column"""
+    names = df['Village_Name'] if 'Village_Name' in df.columns else df.index
+    columns = [df[col] if col in df.columns else [None] * len(df) for col in TRANSITION_COLUMNS]
+    return {name: [_normalize(value) for value in values]
+            for name, *values in zip(names, *columns) if not pd.isna(name)}
+
+
+def transition_records(before, after, by):
+    """Log records for the villages whose key differs between before and
+    after ({name: key}, a missing name being an absent village)"""
+    at = pd.Timestamp.now().isoformat(timespec='seconds')
+    records = []
+    for name in set(before) | set(after):
+        old, new = before.get(name), after.get(name)
+        if old != new:
+            records.append({'at': at, 'village': name, 'from': old, 'to': new, 'by': by})
+    return records
+
+
+def append_transitions(records, counts, log_path=TRANSITIONS_LOG):
+    """Append records to the transition log, or start the log with the
+    baseline counts() ([[zone, phase, status, villages], ...] after this
+    write) if it does not exist yet. Called under the backend's write lock."""
+    if not records:
+        return
+    with file_lock(log_path):
+        if os.path.exists(log_path):
+            lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        else:
+            lines = [json.dumps({'at': records[0]['at'], 'baseline': counts()}, ensure_ascii=False)]
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _key_counts(keys):
+    counts = {}
+    for key in keys:
+        counts[tuple(key)] = counts.get(tuple(key), 0) + 1
+    return [list(key) + [n] for key, n in counts.items()]
+
+
+def read_transitions(offset=0, log_path=TRANSITIONS_LOG):
+    """(records, next offset): the complete lines of the transition log from
+    byte offset on. A line still being written is left for the next call."""
+    try:
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    end = data.rfind(b'\n') + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # A torn line from a crash mid-write is skipped
+            continue
+    return records, offset + end
+
+
+def _upsert_transitions(name, current, fields):
+    """Records for one village written with fields over current (None if new)"""
+    before = {name: [_normalize(current.get(col)) for col in TRANSITION_COLUMNS]} if current is not None else {}
+    merged = dict(current or {})
+    merged.update(fields)
+    after = {name: [_normalize(merged.get(col)) for col in TRANSITION_COLUMNS]}
+    return transition_records(before, after, 'add' if current is None else 'update')
+
+
+def _import_transitions(before, written, kept=None):
+    """Records for an import that wrote the keys written ({name: key}) over
+    the villages before and, when kept is given, removed every village whose
+    name is not in it"""
+    touched = set(written)
+    if kept is not None:
+        touched.update(name for name in before if name not in kept)
+    return transition_records({name: before[name] for name in touched if name in before}, written, 'import')
+
+
+class CSVBackend:
+    """Villages stored in villages_data.csv, rewritten on every save"""
+
+    name = 'csv'
+
+    def __init__(self, csv_path=VILLAGES_DATA):
+        self.csv_path = csv_path
+
+    @property
+    def location(self):
+        return self.csv_path
+
+    def version(self):
+        """Change token for the villages data"""
+        return file_signature(self.csv_path)
+
+    def follows(self, before, after):
+        """Whether version after is exactly one write on top of before.
+        File signatures are not ordered, so this is never known for CSV."""
+        return False
+
+    def load_villages(self):
+        """Load all villages; df.attrs['version'] is the version that was read"""
+        key = self.version()
+        df = read_snapshot('villages-csv', key)
+        if df is not None:
+            df.attrs['version'] = key
+            return df
+        with open(self.csv_path, 'rb') as f:
+            # Signature of the file actually opened: a concurrent os.replace
+            # swaps in a new inode and leaves this handle on the old one
+            st = os.fstat(f.fileno())
+            df = read_villages_csv(f)
+        df.attrs['version'] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        # Rows written before versioning count as version 1, as after the
+        # SQLite migration, so that version 0 always means "does not exist"
+        if VERSION_COLUMN not in df.columns:
+            df[VERSION_COLUMN] = 1
+        df[VERSION_COLUMN] = df[VERSION_COLUMN].fillna(1).astype(int)
+        df = index_villages(apply_village_schema(df))
+        write_snapshot('villages-csv', df, df.attrs['version'])
+        return df
+
+    def upsert_village(self, row, expected_version=None, base=None):
+        """Insert or update a single village; returns (Row_Version, merged)"""
+        with file_lock(self.csv_path):
+            # The loaded frame may sit on a read-only memory-mapped snapshot
+            df = self.load_villages().copy()
+            name = row['Village_Name']
+            current = df.loc[name].to_dict() if name in df.index else None
+            fields, merged = merge_village_update(current, row, expected_version, base)
+            version = (int(current[VERSION_COLUMN]) if current is not None else 0) + 1
+            fields[VERSION_COLUMN] = version
+            df = _assign_row(df, name, fields)
+            atomic_write_csv(df, self.csv_path)
+            append_transitions(_upsert_transitions(name, current, fields),
+                               lambda: _key_counts(transition_keys(df).values()))
+        return version, merged
+
+    def import_villages(self, chunks, replace=False):
+        """Apply an import streamed as (rows_to_write, names_in_chunk) pairs.
+
+        rows_to_write (indexed by Village_Name) are inserted or updated; with
+        replace=True villages whose name never appeared in any chunk are
+        removed. Returns (written, deleted).
+        """
+        with file_lock(self.csv_path):
+            df = self.load_villages().copy()
+            before = transition_keys(df)
+            written_keys = {}
+            seen = set()
+            written = 0
+            for rows, names in chunks:
+                seen.update(names)
+                if rows.empty:
+                    continue
+                rows = rows.drop(columns=[VERSION_COLUMN], errors='ignore')
+                written_keys.update(transition_keys(rows))
+                for col in rows.columns:
+                    if col not in df.columns:
+                        df[col] = None
+                    else:
+                        _make_room(df, col, rows[col])
+                existing = rows.index[rows.index.isin(df.index)]
+                if len(existing):
+                    cols = list(rows.columns)
+                    df.loc[existing, cols] = rows.loc[existing, cols].to_numpy()
+                    df.loc[existing, VERSION_COLUMN] = df.loc[existing, VERSION_COLUMN] + 1
+                added = rows[~rows.index.isin(df.index)].copy()
+                if not added.empty:
+                    added[VERSION_COLUMN] = 1
+                    df = pd.concat([df, added])
+                written += len(rows)
+            deleted = 0
+            if replace:
+                keep = df.index.isin(list(seen))
+                deleted = int((~keep).sum())
+                df = df[keep]
+            atomic_write_csv(df, self.csv_path)
+            append_transitions(_import_transitions(before, written_keys, seen if replace else None),
+                               lambda: _key_counts(transition_keys(df).values()))
+        return written, deleted
+
+
+class SQLiteBackend:
+    """Villages stored in an SQLite database (WAL mode) keyed on Village_Name"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path=DATABASE, csv_path=VILLAGES_DATA):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        # sqlite3 connections cannot be shared between threads and Streamlit
+        # runs every session in its own thread, so keep one per thread
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._database_id = None
+
+    @property
+    def location(self):
+        return self.db_path
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_schema(conn)
+                    self._database_id = conn.execute(
+                        "SELECT value FROM meta WHERE key = 'database_id'").fetchone()[0]
+                    self.migrate_from_csv(conn)
+                    self._initialized = True
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn):
+        """Write transaction holding SQLite's write lock from the start, so
+        concurrent writers in other processes queue up instead of interleaving"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _create_schema(self, conn):
+        column_defs = [f'{_quote(col)} {_column_type(col)}' for col in VILLAGE_COLUMNS + [VERSION_COLUMN]]
+        with self._transaction(conn):
+            conn.execute(f'CREATE TABLE IF NOT EXISTS villages ({", ".join(column_defs)})')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            # Tells snapshots of a recreated database apart, whose version
+            # counter starts again from zero
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('database_id', ?)",
+                         (uuid.uuid4().hex,))
+            self._ensure_columns(conn, [VERSION_COLUMN])
+
+    def _columns(self, conn):
+        return [r[1] for r in conn.execute('PRAGMA table_info(villages)')]
+
+    def _ensure_columns(self, conn, columns):
+        """Add columns that appear in uploaded data but not yet in the table"""
+        existing = set(self._columns(conn))
+        for col in columns:
+            if col not in existing:
+                conn.execute(f'ALTER TABLE villages ADD COLUMN {_quote(col)} {_column_type(col, new=True)}')
+                existing.add(col)
+
+    def _upsert_rows(self, conn, columns, rows, bump=False):
+        """INSERT ... ON CONFLICT DO UPDATE rows; with bump=True the Row_Version
+        of each row is incremented (new rows start at 1)"""
+        if bump:
+            columns = list(columns) + [VERSION_COLUMN]
+            rows = [tuple(row) + (1,) for row in rows]
+        col_sql = ', '.join(_quote(c) for c in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in columns
+                            if c != 'Village_Name' and not (bump and c == VERSION_COLUMN))
+        if bump:
+            updates += f', {VERSION_COLUMN} = villages.{VERSION_COLUMN} + 1'
+        sql = f'INSERT INTO villages ({col_sql}) VALUES ({placeholders})'
+        if updates:
+            sql += f' ON CONFLICT(Village_Name) DO UPDATE SET {updates}'
+        else:
+            sql += ' ON CONFLICT(Village_Name) DO NOTHING'
+        conn.executemany(sql, rows)
+
+    def _frame_rows(self, df, versions=None):
+        # Rows without a village name cannot be keyed
+        df = df[df['Village_Name'].notna()]
+        df = df.drop(columns=[VERSION_COLUMN], errors='ignore')
+        columns = list(df.columns)
+        rows = [tuple(_to_sql_value(v) for v in record)
+                for record in df.itertuples(index=False, name=None)]
+        if versions is not None:
+            name_pos = columns.index('Village_Name')
+            columns.append(VERSION_COLUMN)
+            rows = [row + ((versions.get(row[name_pos]) or 0) + 1,) for row in rows]
+        return columns, rows
+
+    def _current_row(self, conn, village_name):
+        cursor = conn.execute('SELECT * FROM villages WHERE Village_Name = ?', (village_name,))
+        record = cursor.fetchone()
+        if record is None:
+            return None
+        return dict(zip([d[0] for d in cursor.description], record))
+
+    def migrate_from_csv(self, conn=None):
+        """One-shot import of villages_data.csv into the database"""
+        conn = conn or self._connect()
+        with self._transaction(conn):
+            done = conn.execute("SELECT value FROM meta WHERE key = 'villages_migrated'").fetchone()
+            if done:
+                return False
+            if os.path.exists(self.csv_path):
+                df = apply_village_schema(read_villages_csv(self.csv_path))
+                if 'Village_Name' in df.columns:
+                    columns, rows = self._frame_rows(df, versions={})
+                    self._ensure_columns(conn, columns)
+                    self._upsert_rows(conn, columns, rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('villages_migrated', ?)",
+                         (pd.Timestamp.now().isoformat(),))
+            self._bump_version(conn)
+        return True
+
+    def version(self):
+        """Change token for the villages data, bumped by every write
+        transaction from any process"""
+        conn = self._connect()
+        record = conn.execute("SELECT value FROM meta WHERE key = 'villages_version'").fetchone()
+        return int(record[0]) if record else 0
+
+    def follows(self, before, after):
+        """Whether version after is exactly one write on top of before"""
+        return after == before + 1
+
+    def _bump_version(self, conn):
+        conn.execute("INSERT INTO meta (key, value) VALUES ('villages_version', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+
+    def load_villages(self):
+        """Load all villages; df.attrs['version'] is the version that was read"""
+        conn = self._connect()
+        key = [self._database_id, self.version()]
+        df = read_snapshot('villages-sqlite', key)
+        if df is not None:
+            df.attrs['version'] = key[1]
+            return df
+        # One read transaction so the version matches the rows (WAL snapshot)
+        conn.execute('BEGIN')
+        try:
+            record = conn.execute("SELECT value FROM meta WHERE key = 'villages_version'").fetchone()
+            df = pd.read_sql_query('SELECT * FROM villages ORDER BY rowid', conn)
+        finally:
+            conn.execute('COMMIT')
+        df.attrs['version'] = int(record[0]) if record else 0
+        # Dates are stored as ISO strings, so they all take the fast path
+        df = index_villages(apply_village_schema(df))
+        write_snapshot('villages-sqlite', df, [self._database_id, df.attrs['version']])
+        return df
+
+    def _transition_keys(self, conn):
+        """transition_keys() of every stored village"""
+        cols = ', '.join(_quote(c) for c in ['Village_Name'] + TRANSITION_COLUMNS)
+        return {name: [_normalize(value) for value in values]
+                for name, *values in conn.execute(f'SELECT {cols} FROM villages')}
+
+    def _key_counts(self, conn):
+        """Stored villages per [zone, phase, status], for the transition log baseline"""
+        cols = ', '.join(_quote(c) for c in TRANSITION_COLUMNS)
+        return [[_normalize(value) for value in row[:-1]] + [row[-1]]
+                for row in conn.execute(f'SELECT {cols}, COUNT(*) FROM villages GROUP BY {cols}')]
+
+    def upsert_village(self, row, expected_version=None, base=None):
+        """Insert or update a single village keyed on Village_Name; returns
+        (Row_Version, merged). See merge_village_update for expected_version
+        and base."""
+        conn = self._connect()
+        with self._transaction(conn):
+            current = self._current_row(conn, row['Village_Name'])
+            fields, merged = merge_village_update(current, row, expected_version, base)
+            version = (int(current[VERSION_COLUMN] or 0) if current is not None else 0) + 1
+            fields[VERSION_COLUMN] = version
+            columns = list(fields.keys())
+            self._ensure_columns(conn, columns)
+            self._upsert_rows(conn, columns, [tuple(_to_sql_value(fields[c]) for c in columns)])
+            self._bump_version(conn)
+            append_transitions(_upsert_transitions(row['Village_Name'], current, fields),
+                               lambda: self._key_counts(conn))
+        return version, merged
+
+    def import_villages(self, chunks, replace=False):
+        """Apply an import streamed as (rows_to_write, names_in_chunk) pairs in
+        one transaction, one executemany per chunk.
+
+        rows_to_write (indexed by Village_Name) are inserted or updated; with
+        replace=True villages whose name never appeared in any chunk are
+        removed. Returns (written, deleted).
+        """
+        conn = self._connect()
+        written = 0
+        with self._transaction(conn):
+            before = self._transition_keys(conn)
+            written_keys = {}
+            seen = set()
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS import_names (name TEXT PRIMARY KEY)')
+            conn.execute('DELETE FROM import_names')
+            for rows, names in chunks:
+                conn.executemany('INSERT OR IGNORE INTO import_names (name) VALUES (?)',
+                                 [(str(name),) for name in names])
+                seen.update(str(name) for name in names)
+                if rows.empty:
+                    continue
+                written_keys.update(transition_keys(rows))
+                columns, values = self._frame_rows(rows)
+                self._ensure_columns(conn, columns)
+                self._upsert_rows(conn, columns, values, bump=True)
+                written += len(values)
+            deleted = 0
+            if replace:
+                deleted = conn.execute('DELETE FROM villages WHERE Village_Name NOT IN '
+                                       '(SELECT name FROM import_names)').rowcount
+            conn.execute('DELETE FROM import_names')
+            self._bump_version(conn)
+            append_transitions(_import_transitions(before, written_keys, seen if replace else None),
+                               lambda: self._key_counts(conn))
+        return written, deleted
+
+
+def update_village(name, expected_version=None, base=None, **fields):
+    """Write fields of the village called name, creating it if needed.
+
+    This is the write path of the dashboard's village forms. Bulk import
+    does not go through it: the backend's import_villages writes each chunk
+    of an upload with one statement, all chunks in one transaction, rather
+    than one transaction per village. expected_version / base enable
+    stale-edit detection (see merge_village_update); expected_version=0
+    only creates a new village. Returns (Row_Version, merged).
+    """
+    row = {'Village_Name': name}
+    row.update(fields)
+    return get_storage().upsert_village(row, expected_version=expected_version, base=base)
+
+
+_BACKENDS = {
+    'csv': CSVBackend,
+    'sqlite': SQLiteBackend,
+}
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage backend"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = os.environ.get('DASHBOARD_STORAGE', 'sqlite').lower()
+                if backend not in _BACKENDS:
+                    raise ValueError(f"Unknown DASHBOARD_STORAGE '{backend}', expected one of: {', '.join(_BACKENDS)}")
+                _storage = _BACKENDS[backend]()
+    return _storage
+
+
+# Change feed: open dashboards poll data_versions() and refresh when a data
+# set they show has changed. Polls within VERSIONS_MAX_AGE seconds of each
+# other share one lookup, however many sessions are open.
+VERSIONS_MAX_AGE = 1.0
+_versions = [0.0, None]
+_versions_lock = threading.Lock()
+
+
+def data_versions(max_age=VERSIONS_MAX_AGE):
+    """Change tokens of the villages, progress, responsibility and remarks
+    data. Every write, from any process, changes the token of its data set.
+    Results up to max_age seconds old are reused."""
+    with _versions_lock:
+        checked, versions = _versions
+        now = time.monotonic()
+        if versions is None or now - checked > max_age:
+            versions = {
+                'villages': get_storage().version(),
+                'progress': file_signature(PROGRESS_DATA),
+                'responsibility': file_signature(RESPONSIBILITY_DATA),
+                'remarks': remarks_signature(),
+            }
+            _versions[:] = [now, versions]
+        return versions
+
+
+# Remarks log
+
+def _append_log_record(record, log_path=REMARKS_LOG):
+    """Append one JSON record to the remarks log and fsync it"""
+    line = json.dumps(record, default=str) + '\n'
+    with file_lock(log_path):
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _read_log_records(log_path=REMARKS_LOG):
+    if not os.path.exists(log_path):
+        return []
+    records = []
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-write is skipped
+                continue
+    return records
+
+
+def load_remarks(csv_path=REMARKS_DATA, log_path=REMARKS_LOG):
+    """Load remarks_data.csv and replay the append-only remarks log on top;
+    df.attrs['version'] is the remarks_signature() that was read"""
+    # Shared lock so a compaction cannot swap the CSV and drop the log
+    # between the two reads
+    with file_lock(log_path, shared=True):
+        key = remarks_signature(csv_path, log_path)
+        df = read_snapshot('remarks', key)
+        if df is None:
+            df = _load_remarks(csv_path, log_path)
+            write_snapshot('remarks', df, key)
+        df.attrs['version'] = key
+        return df
+
+
+def _load_remarks(csv_path, log_path):
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    if 'Remark_ID' not in df.columns:
+        df.insert(0, 'Remark_ID', '')
+    # Rows written before remarks had IDs get one from their position;
+    # compaction preserves row order and persists these IDs
+    missing = df['Remark_ID'] == ''
+    df.loc[missing, 'Remark_ID'] = ['r' + str(i) for i in df.index[missing]]
+
+    new_rows = []
+    responses = {}
+    for record in _read_log_records(log_path):
+        kind = record.pop('type', None)
+        if kind == 'remark':
+            new_rows.append(record)
+        elif kind == 'status':
+            responses[record['Remark_ID']] = record
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows, dtype=str)], ignore_index=True)
+    if responses:
+        positions = pd.Index(df['Remark_ID'])
+        for remark_id, record in responses.items():
+            loc = positions.get_indexer([remark_id])[0]
+            if loc >= 0:
+                df.loc[loc, 'Status'] = record.get('Status', '')
+                df.loc[loc, 'Response'] = record.get('Response', '')
+
+    for col in REMARKS_COLUMNS:
+        if col not in df.columns:
+            df[col] = ''
+    df = df.fillna('')
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce', format='mixed')
+    return df
+
+
+def append_remark(remark, log_path=REMARKS_LOG):
+    """Record a new remark and return its Remark_ID"""
+    record = {col: remark.get(col, '') for col in REMARKS_COLUMNS}
+    record['Remark_ID'] = record['Remark_ID'] or uuid.uuid4().hex[:12]
+    if hasattr(record['Date'], 'isoformat'):
+        record['Date'] = record['Date'].isoformat()
+    record['type'] = 'remark'
+    _append_log_record(record, log_path)
+    return record['Remark_ID']
+
+
+def append_remark_status(remark_id, status, response, log_path=REMARKS_LOG):
+    """Record a status change / response for an existing remark"""
+    _append_log_record({'type': 'status', 'Remark_ID': remark_id,
+                        'Status': status, 'Response': response}, log_path)
+
+
+def compact_remarks(csv_path=REMARKS_DATA, log_path=REMARKS_LOG, min_bytes=REMARKS_LOG_COMPACT_BYTES):
+    """Fold the remarks log into remarks_data.csv once it is larger than min_bytes"""
+    if not os.path.exists(log_path) or os.path.getsize(log_path) < min_bytes:
+        return False
+    with file_lock(log_path):
+        # Another process may have compacted while we waited for the lock
+        if not os.path.exists(log_path) or os.path.getsize(log_path) < min_bytes:
+            return False
+        df = _load_remarks(csv_path, log_path)
+        atomic_write_csv(df[REMARKS_COLUMNS], csv_path)
+        os.remove(log_path)
+    return True
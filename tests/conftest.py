@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# storage reads the data directory when it is imported, so it is set before
+# any test module imports it
+os.environ.setdefault('DASHBOARD_DATA_DIR', tempfile.mkdtemp(prefix='dashboard-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
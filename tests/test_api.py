@@ -0,0 +1,82 @@
+import gzip
+import json
+import threading
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import api
+from storage import REMARKS_COLUMNS, REMARKS_DATA, append_remark
+
+
+@pytest.fixture(scope='module')
+def server():
+    pd.DataFrame([
+        {'Remark_ID': 'r1', 'Date': '2024-01-01 09:00', 'Official_Name': 'A', 'Department': 'MCL',
+         'Phase': 'Notification', 'Village': 'Alpha', 'Remarks': 'Drone delayed',
+         'Help_Required': 'Technical Support', 'Status': 'Pending', 'Response': ''},
+        {'Remark_ID': 'r2', 'Date': '2024-01-02 09:00', 'Official_Name': 'B', 'Department': 'Revenue',
+         'Phase': 'Map 3', 'Village': 'Beta', 'Remarks': 'Map printed',
+         'Help_Required': 'General Query', 'Status': 'Resolved', 'Response': 'Done'},
+    ], columns=REMARKS_COLUMNS).to_csv(REMARKS_DATA, index=False)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), api.APIHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(port, path, headers=None):
+    conn = HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('GET', path, headers=headers or {})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    if response.getheader('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return response, body
+
+
+def test_remarks_filters_and_pages(server):
+    response, body = _get(server, '/api/remarks?status=Pending&help_required=Technical%20Support')
+    assert response.status == 200
+    data = json.loads(body)
+    assert data['total'] == 1 and data['items'][0]['Remark_ID'] == 'r1'
+    _, body = _get(server, '/api/remarks?limit=1&offset=1')
+    assert [item['Remark_ID'] for item in json.loads(body)['items']] == ['r2']
+
+
+def test_etag_and_not_modified(server):
+    first, _ = _get(server, '/api/remarks')
+    etag = first.getheader('ETag')
+    assert etag and _get(server, '/api/remarks')[0].getheader('ETag') == etag
+    assert _get(server, '/api/remarks?status=Pending')[0].getheader('ETag') != etag
+
+    response, body = _get(server, '/api/remarks', {'If-None-Match': etag})
+    assert response.status == 304 and body == b''
+    assert _get(server, '/api/remarks', {'If-None-Match': 'W/' + etag})[0].status == 304
+    assert _get(server, '/api/remarks', {'If-None-Match': '"other"'})[0].status == 200
+
+
+def test_etag_changes_with_the_data(server):
+    etag = _get(server, '/api/remarks')[0].getheader('ETag')
+    append_remark({'Official_Name': 'C', 'Remarks': 'New remark', 'Status': 'Pending'})
+    # Data versions are looked up at most once a second
+    api.data_versions(max_age=0)
+    response, body = _get(server, '/api/remarks', {'If-None-Match': etag})
+    assert response.status == 200 and json.loads(body)['total'] == 3
+
+
+@pytest.mark.parametrize('query', ['limit=abc', 'limit=0', 'limit=5000', 'offset=-1', 'from=notadate',
+                                   'to=2024-13-45'])
+def test_bad_parameters_are_400(server, query):
+    response, body = _get(server, '/api/remarks?' + query)
+    assert response.status == 400
+    assert 'error' in json.loads(body)
+
+
+def test_unknown_endpoint_is_404(server):
+    assert _get(server, '/api/nothing')[0].status == 404
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from importer import _changed, _typed, validate_chunk
+
+
+def _chunk(rows):
+    return pd.DataFrame(rows, columns=['Village_Name', 'Municipal_Zone', 'Current_Phase', 'Status',
+                                       'Survey_Date']).astype(str)
+
+
+def test_validate_chunk_reports_every_problem_by_line():
+    chunk = _chunk([
+        ['Alpha', 'A', 'Notification', 'On Track', '2024-01-05'],
+        ['', 'A', 'Notification', 'On Track', ''],
+        ['Beta', 'Z', 'Nowhere', 'On Track', 'soon'],
+        ['Alpha', 'B', 'Pasting', 'Completed', ''],
+        ['Gamma', 'C', 'Map 3', 'Behind Schedule', ''],
+    ])
+    errors, invalid = validate_chunk(chunk, _typed(chunk), first_line=2, seen={'Gamma'})
+    assert invalid.tolist() == [False, True, True, True, True]
+    assert [(e['Line'], e['Column']) for e in errors] == [
+        (3, 'Village_Name'),
+        (4, 'Current_Phase'), (4, 'Municipal_Zone'), (4, 'Survey_Date'),
+        (5, 'Village_Name'),
+        (6, 'Village_Name'),
+    ]
+
+
+def test_changed_keeps_only_new_and_different_rows():
+    current = pd.DataFrame({
+        'Village_Name': ['Alpha', 'Beta'],
+        'Municipal_Zone': ['A', 'B'],
+        'Current_Phase': ['Notification', 'Pasting'],
+        'Status': ['On Track', 'On Track'],
+        'Survey_Date': pd.to_datetime(['2024-01-05', None]),
+    }).set_index('Village_Name', drop=False)
+    chunk = _chunk([
+        ['Alpha', 'A', 'Notification', 'On Track', '2024-01-05'],
+        ['Beta', 'B', 'Pasting', 'On Track', '2024-02-01'],
+        ['Gamma', 'C', 'Map 3', 'On Track', ''],
+    ])
+    assert _changed(_typed(chunk), current).tolist() == [False, True, True]
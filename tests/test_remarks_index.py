@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from remarks_index import RemarksIndex
+
+
+@pytest.fixture(scope='module')
+def remarks():
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-01 09:00', '2024-01-02 18:30', '2024-01-03 08:00',
+                                '2024-01-03 23:59', None]),
+        'Department': ['MCL', 'Survey of India', 'MCL', 'Revenue', 'MCL'],
+        'Status': ['Pending', 'Resolved', 'Pending', 'Pending', 'In Progress'],
+        'Help_Required': ['General Query', 'Technical Support', 'Technical Support', 'Other', 'Other'],
+        'Village': ['Alpha', 'Beta', 'Alpha', 'Gamma', 'Beta'],
+        'Phase': ['Notification', 'Map 3', 'Pasting', 'Map 3', 'Pasting'],
+        'Remarks': ['Drone delayed by rain', 'Map printed', 'Need drone operators', 'Objections pending', None],
+        'Response': [None, 'Done', 'Drone team assigned', None, 'Waiting for the delay report'],
+    })
+
+
+def _mask_search(df, filters, text, date_from, date_to):
+    mask = pd.Series(True, index=df.index)
+    for field, value in filters.items():
+        mask &= df[field] == value
+    words = (df['Remarks'].fillna('') + ' ' + df['Response'].fillna('')).str.lower().str.findall(r'\w+')
+    for query in text.lower().split():
+        mask &= words.map(lambda ws: any(w.startswith(query) for w in ws))
+    if date_from is not None:
+        mask &= df['Date'] >= pd.Timestamp(date_from)
+    if date_to is not None:
+        mask &= df['Date'] < pd.Timestamp(date_to) + pd.Timedelta(days=1)
+    return df[mask.fillna(False)]
+
+
+@pytest.mark.parametrize('filters, text, date_from, date_to', [
+    ({}, '', None, None),
+    ({'Department': 'MCL'}, '', None, None),
+    ({'Department': 'MCL', 'Status': 'Pending'}, '', None, None),
+    ({'Village': 'Nowhere'}, '', None, None),
+    ({}, 'drone', None, None),
+    ({}, 'DEL', None, None),
+    ({}, 'drone team', None, None),
+    ({'Help_Required': 'Technical Support'}, 'drone', None, None),
+    ({}, '', '2024-01-02', None),
+    ({}, '', None, '2024-01-02'),
+    ({}, '', '2024-01-03', '2024-01-03'),
+    ({'Status': 'Pending'}, 'objections', '2024-01-01', '2024-01-03'),
+])
+def test_search_matches_pandas_masks(remarks, filters, text, date_from, date_to):
+    found = RemarksIndex(remarks).search(filters, text, date_from, date_to)
+    expected = _mask_search(remarks, filters, text, date_from, date_to)
+    assert found.index.tolist() == expected.index.tolist()
+
+
+def test_options_are_sorted_distinct_values(remarks):
+    assert RemarksIndex(remarks).options('Department') == ['MCL', 'Revenue', 'Survey of India']
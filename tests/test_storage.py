@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+
+from storage import (CSVBackend, DATA_DIR, SQLiteBackend, StaleWriteError, VERSION_COLUMN, atomic_write_csv,
+                     merge_village_update)
+
+
+def _csv_backend():
+    path = os.path.join(DATA_DIR, 'villages_data.csv')
+    atomic_write_csv(pd.DataFrame({
+        'Village_Name': ['Alpha', 'Beta'],
+        'Municipal_Zone': ['A', 'B'],
+        'Current_Phase': ['Notification', 'Map 1 awaited'],
+        'Status': ['On Track', 'On Track'],
+    }), path)
+    backend = CSVBackend(path)
+    # The second load comes from the Arrow snapshot written by the first
+    backend.load_villages()
+    backend.load_villages()
+    return backend
+
+
+def test_csv_upsert_after_snapshot_load():
+    backend = _csv_backend()
+    backend.upsert_village({'Village_Name': 'Alpha', 'Current_Phase': 'Map 2 awaited'})
+    df = backend.load_villages()
+    assert df.loc['Alpha', 'Current_Phase'] == 'Map 2 awaited'
+    assert df.loc['Beta', 'Current_Phase'] == 'Map 1 awaited'
+
+
+def test_csv_merge_import_after_snapshot_load():
+    backend = _csv_backend()
+    rows = pd.DataFrame({'Village_Name': ['Beta', 'Gamma'], 'Municipal_Zone': ['B', 'C'],
+                         'Current_Phase': ['Map 3', 'Pasting'], 'Status': ['On Track', 'On Track']})
+    rows.index = rows['Village_Name'].to_numpy()
+    written, deleted = backend.import_villages(iter([(rows, rows.index.tolist())]))
+    assert (written, deleted) == (2, 0)
+    df = backend.load_villages()
+    assert df.loc['Beta', 'Current_Phase'] == 'Map 3'
+    assert df.loc['Gamma', 'Current_Phase'] == 'Pasting'
+    assert df.loc['Alpha', 'Current_Phase'] == 'Notification'
+
+
+def _frame(names, phases):
+    rows = pd.DataFrame({'Village_Name': names, 'Municipal_Zone': ['A'] * len(names),
+                         'Current_Phase': phases, 'Status': ['On Track'] * len(names)})
+    rows.index = rows['Village_Name'].to_numpy()
+    return rows
+
+
+def test_merge_keeps_fields_changed_elsewhere():
+    current = {'Village_Name': 'Alpha', 'Current_Phase': 'Pasting', 'Status': 'On Track', VERSION_COLUMN: 3}
+    base = {'Current_Phase': 'Map 2 awaited', 'Status': 'On Track'}
+    row = {'Village_Name': 'Alpha', 'Current_Phase': 'Map 2 awaited', 'Status': 'Behind Schedule',
+           'Last_Updated': '2024-05-01'}
+    fields, merged = merge_village_update(current, row, expected_version=2, base=base)
+    assert merged
+    assert fields == {'Village_Name': 'Alpha', 'Status': 'Behind Schedule', 'Last_Updated': '2024-05-01'}
+
+
+def test_merge_rejects_the_same_field_changed_elsewhere():
+    current = {'Village_Name': 'Alpha', 'Current_Phase': 'Pasting', VERSION_COLUMN: 3}
+    base = {'Current_Phase': 'Map 2 awaited'}
+    row = {'Village_Name': 'Alpha', 'Current_Phase': 'Map 3'}
+    with pytest.raises(StaleWriteError) as error:
+        merge_village_update(current, row, expected_version=2, base=base)
+    assert error.value.conflicts == ['Current_Phase']
+
+
+# Version 0: a row stored before versioning
+@pytest.mark.parametrize('version', [0, 1])
+def test_merge_rejects_adding_an_existing_village(version):
+    current = {'Village_Name': 'Alpha', 'Current_Phase': 'Pasting', VERSION_COLUMN: version}
+    with pytest.raises(StaleWriteError) as error:
+        merge_village_update(current, {'Village_Name': 'Alpha', 'Current_Phase': 'Notification'},
+                             expected_version=0)
+    assert error.value.current is current and not error.value.conflicts
+
+
+def test_csv_add_village_does_not_overwrite():
+    backend = _csv_backend()
+    with pytest.raises(StaleWriteError):
+        backend.upsert_village({'Village_Name': 'Alpha', 'Current_Phase': 'Pasting'}, expected_version=0)
+    df = backend.load_villages()
+    assert df.loc['Alpha', 'Current_Phase'] == 'Notification'
+    assert df.loc['Alpha', VERSION_COLUMN] == 1
+
+
+def test_sqlite_row_version_counts_writes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'dashboard.db'), str(tmp_path / 'villages_data.csv'))
+    assert backend.upsert_village({'Village_Name': 'Alpha', 'Current_Phase': 'Notification'},
+                                  expected_version=0)[0] == 1
+    assert backend.upsert_village({'Village_Name': 'Alpha', 'Current_Phase': 'Pasting'},
+                                  expected_version=1)[0] == 2
+    with pytest.raises(StaleWriteError):
+        backend.upsert_village({'Village_Name': 'Alpha', 'Current_Phase': 'Map 3'},
+                               expected_version=1, base={'Current_Phase': 'Notification'})
+
+    rows = _frame(['Alpha', 'Beta'], ['Map 3', 'Pasting'])
+    assert backend.import_villages(iter([(rows, rows.index.tolist())])) == (2, 0)
+    versions = backend.load_villages()[VERSION_COLUMN]
+    assert versions.to_dict() == {'Alpha': 3, 'Beta': 1}